@@ -1,17 +1,139 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
 
+from fastapi import APIRouter, FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from api.db.database import pool_stats
+from api.db.replicas import ReadYourWritesMiddleware, replicas
+from api.instrumentation import QueryStatsMiddleware
+from api.metrics import (
+    MetricsMiddleware,
+    exposition,
+    is_multiprocess,
+    mark_process_dead,
+    record_state,
+)
+from api.response_cache import article_list_cache
 from api.routes import article, comments, favorites, profile, tags, user
+from api.routes.user import login_latency
+from api.security import password_hasher, principal_cache
+from api.settings import get_settings
+from api.warmup import warm_up
+
+settings = get_settings()
+
+
+def record_metrics_state():
+    record_state(
+        pool=pool_stats(),
+        caches={
+            'principal': principal_cache.stats(),
+            'article_list': article_list_cache.stats(),
+        },
+        hasher=password_hasher.stats(),
+    )
+
+
+async def refresh_metrics():
+    # Only the worker answering /metrics records its state then, so with
+    # several workers each one records its own on a timer.
+    while True:
+        record_metrics_state()
+        await asyncio.sleep(settings.METRICS_REFRESH_SECONDS)
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.WARM_UP:
+        app.state.warm_up = await warm_up()
+    background = []
+    if is_multiprocess():
+        background.append(asyncio.create_task(refresh_metrics()))
+    if replicas.replicas:
+        background.append(asyncio.create_task(replicas.keep_checking()))
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    for task in background:
+        task.cancel()
+    mark_process_dead()
+    password_hasher.shutdown()
 
-app.include_router(article.router)
-app.include_router(comments.router)
-app.include_router(user.router)
-app.include_router(profile.router)
-app.include_router(favorites.router)
-app.include_router(tags.router)
 
+health = APIRouter()
 
-@app.get('/health-check')
+
+@health.get('/health-check')
 def health_check():
     return True
+
+
+@health.get('/health-check/ready')
+def health_check_ready(request: Request):
+    """Ready once startup, warm-up included, is over; 503 until then."""
+    state = request.app.state
+    if not state.ready:
+        return JSONResponse({'ready': False}, status_code=503)
+
+    return {'ready': True, 'warm_up': state.warm_up}
+
+
+@health.get('/health-check/pool')
+def health_check_pool():
+    return pool_stats()
+
+
+@health.get('/health-check/replicas')
+def health_check_replicas():
+    return replicas.stats()
+
+
+@health.get('/health-check/cache')
+def health_check_cache():
+    return {
+        'principal': principal_cache.stats(),
+        'article_list': article_list_cache.stats(),
+    }
+
+
+@health.get('/health-check/hashing')
+def health_check_hashing():
+    return {
+        'hasher': password_hasher.stats(),
+        'login': login_latency.stats(),
+    }
+
+
+@health.get('/metrics', include_in_schema=False)
+def metrics():
+    record_metrics_state()
+    return Response(exposition(), media_type=CONTENT_TYPE_LATEST)
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application; `uvicorn --factory api.app:create_app` serves
+    a fresh one, `api.app:app` the one built at import.
+    """
+    app = FastAPI(lifespan=lifespan)
+    app.state.ready = False
+    app.state.warm_up = None
+
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    app.include_router(article.router)
+    app.include_router(comments.router)
+    app.include_router(user.router)
+    app.include_router(profile.router)
+    app.include_router(favorites.router)
+    app.include_router(tags.router)
+    app.include_router(health)
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Hashable, Iterable, Optional, Protocol
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire after a time-to-live.
+
+    Once `maxsize` entries are stored, the least recently used one is
+    evicted to make room. Hits and misses are counted so the cache can be
+    sized from real traffic.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def remove_where(self, predicate: Callable[[Any], bool]):
+        """Drop every entry whose value matches `predicate`."""
+        for key in [
+            key
+            for key, (_, value) in self._entries.items()
+            if predicate(value)
+        ]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ResponseCache(Protocol):
+    """
+    Store of serialized responses, invalidated by tag.
+
+    Every stored value carries tags naming what it was built from.
+    Invalidating a tag drops every value carrying it. A value is only
+    stored if no invalidation happened since `generation` was read before
+    building it, so a response computed from data being overwritten is
+    never cached. The methods are async so a shared store can implement
+    them over the network.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    async def generation(self) -> int:
+        ...
+
+    async def set(
+        self, key: str, value: bytes, tags: Iterable[str], generation: int
+    ):
+        ...
+
+    async def invalidate(self, tags: Iterable[str]):
+        ...
+
+    async def clear(self):
+        ...
+
+    def stats(self) -> dict:
+        ...
+
+
+class MemoryResponseCache:
+    """
+    In-process `ResponseCache`, bounded by the bytes it holds.
+
+    The least recently used entries are evicted once `maxbytes` is
+    exceeded, and entries expire after `ttl` seconds regardless.
+    """
+
+    def __init__(self, maxbytes: int, ttl: float):
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._keys_by_tag: dict[str, set[str]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def generation(self) -> int:
+        return self._generation
+
+    async def set(
+        self, key: str, value: bytes, tags: Iterable[str], generation: int
+    ):
+        if generation != self._generation or len(value) > self.maxbytes:
+            return
+
+        if key in self._entries:
+            self._drop(key)
+
+        tags = frozenset(tags)
+        self._entries[key] = (monotonic() + self.ttl, value, tags)
+        self.size += len(value)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+
+        while self.size > self.maxbytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate(self, tags: Iterable[str]):
+        self._generation += 1
+        for tag in tags:
+            for key in self._keys_by_tag.get(tag, set()).copy():
+                self._drop(key)
+
+    async def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self.size = 0
+
+    def _drop(self, key: str):
+        _, value, tags = self._entries.pop(key)
+        self.size -= len(value)
+        for tag in tags:
+            keys = self._keys_by_tag[tag]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[tag]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'maxbytes': self.maxbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from time import perf_counter
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db import purge, search, timeline
+from api.db.database import open_session
+from api.db.export import export_articles, gzipped
+from api.db.models import (
+    Article,
+    Favorites,
+    Follow,
+    PostComment,
+    TagArticle,
+    TagStats,
+    User,
+)
+from api.db.replicas import copy_sqlite
+from api.explain import full_scans, query_plan, route_queries
+from api.settings import get_settings
+
+settings = get_settings()
+
+
+async def repair_counters(session: AsyncSession):
+    """Rebuild the denormalized counters from their source rows."""
+    favorites_count = (
+        select(func.count())
+        .where(Favorites.article_id == Article.id)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        update(Article)
+        .where(Article.favorites_count != favorites_count)
+        .values(
+            favorites_count=favorites_count,
+            # A counter is not an edit: keep updated_at's onupdate off.
+            updated_at=Article.updated_at,
+        )
+    )
+    print(f'favorites_count: {result.rowcount} articles repaired')
+
+    comments_count = (
+        select(func.count())
+        .where(PostComment.article_slug == Article.slug)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        update(Article)
+        .where(Article.comments_count != comments_count)
+        .values(
+            comments_count=comments_count,
+            updated_at=Article.updated_at,
+        )
+    )
+    print(f'comments_count: {result.rowcount} articles repaired')
+
+    followers_count = (
+        select(func.count())
+        .where(Follow.following_id == User.id)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        update(User)
+        .where(User.followers_count != followers_count)
+        .values(followers_count=followers_count)
+    )
+    print(f'followers_count: {result.rowcount} users repaired')
+
+    await session.execute(delete(TagStats))
+    result = await session.execute(
+        insert(TagStats).from_select(
+            ['name', 'articles_count'],
+            select(TagArticle.tag_name, func.count()).group_by(
+                TagArticle.tag_name
+            ),
+        )
+    )
+    print(f'tag_stats: {result.rowcount} tags counted')
+
+    await session.commit()
+
+
+async def rebuild_timelines(session: AsyncSession):
+    """Refill every feed timeline from the current follows."""
+    await timeline.rebuild(session)
+    await session.commit()
+
+
+async def rebuild_search(session: AsyncSession):
+    """Reindex every article for full-text search."""
+    await search.rebuild(session)
+    await session.commit()
+
+
+async def explain(session: AsyncSession):
+    """Print the plan of every route query and flag full table scans."""
+    scanned = 0
+    for name, statement in route_queries().items():
+        plan = await query_plan(session, statement)
+        scans = full_scans(plan)
+        scanned += bool(scans)
+
+        print(f'{"FULL SCAN" if scans else "ok":9}  {name}')
+        for step in plan:
+            print(f'           {step}')
+
+    return 1 if scanned else 0
+
+
+async def purge_deleted_users(session: AsyncSession):
+    """Finish deleting users whose background purge was interrupted."""
+    users = (
+        await session.execute(
+            select(User.id, User.username).where(User.deleted_at.is_not(None))
+        )
+    ).all()
+    for user_id, username in users:
+        await purge.purge_user(user_id, username)
+        print(f'{username}: purged')
+
+
+async def export(
+    session: AsyncSession,
+    output: str,
+    gzip: bool,
+    updated_since: Optional[datetime],
+    chunk_size: int,
+):
+    """Write every article, or those changed since a time, as NDJSON."""
+    chunks = export_articles(session, updated_since, chunk_size)
+    articles = 0
+
+    async def counted():
+        nonlocal articles
+        async for chunk in chunks:
+            articles += chunk.count(b'\n')
+            yield chunk
+
+    file = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    try:
+        async for chunk in gzipped(counted()) if gzip else counted():
+            file.write(chunk)
+    finally:
+        if file is not sys.stdout.buffer:
+            file.close()
+
+    print(f'{articles} articles exported', file=sys.stderr)
+
+
+async def replicate(
+    session: AsyncSession, replica: str, interval: Optional[float]
+):
+    """
+    Copy the SQLite database of DB_URL to `replica`, once or every
+    `interval` seconds, to serve as one of DB_REPLICA_URLS.
+    """
+    source = make_url(settings.DB_URL)
+    if source.get_backend_name() != 'sqlite' or not source.database:
+        print('DB_URL is not a SQLite file', file=sys.stderr)
+        return 1
+
+    while True:
+        started = perf_counter()
+        await asyncio.to_thread(copy_sqlite, source.database, replica)
+        print(
+            f'{replica}: copied in {perf_counter() - started:.3f}s',
+            file=sys.stderr,
+        )
+        if interval is None:
+            return 0
+        await asyncio.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m api.cli')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser(
+        'repair-counters',
+        help='rebuild the denormalized counters from their source rows',
+    ).set_defaults(handler=repair_counters)
+    commands.add_parser(
+        'rebuild-timelines',
+        help='refill the feed timelines from the follows',
+    ).set_defaults(handler=rebuild_timelines)
+    commands.add_parser(
+        'rebuild-search',
+        help='reindex every article for full-text search',
+    ).set_defaults(handler=rebuild_search)
+    commands.add_parser(
+        'explain',
+        help='check that every route query is served by an index',
+    ).set_defaults(handler=explain)
+
+    commands.add_parser(
+        'purge-deleted-users',
+        help='finish deleting users closed with a background purge',
+    ).set_defaults(handler=purge_deleted_users)
+
+    export_parser = commands.add_parser(
+        'export', help='write the articles as NDJSON'
+    )
+    export_parser.add_argument(
+        'output', nargs='?', default='-', help='file to write, - for stdout'
+    )
+    export_parser.add_argument(
+        '--gzip', action='store_true', help='compress the output'
+    )
+    export_parser.add_argument(
+        '--updated-since',
+        type=datetime.fromisoformat,
+        help='only articles changed at or after this time, UTC unless '
+        'it has an offset',
+    )
+    export_parser.add_argument(
+        '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE
+    )
+    export_parser.set_defaults(handler=export)
+
+    replicate_parser = commands.add_parser(
+        'replicate', help='copy a SQLite DB_URL to a read replica'
+    )
+    replicate_parser.add_argument('replica', help='SQLite file to write')
+    replicate_parser.add_argument(
+        '--interval',
+        type=float,
+        help='copy again every this many seconds, instead of once',
+    )
+    replicate_parser.set_defaults(handler=replicate)
+
+    args = parser.parse_args(argv)
+    options = {
+        name: value
+        for name, value in vars(args).items()
+        if name not in ('command', 'handler')
+    }
+
+    sys.exit(asyncio.run(run(args.handler, **options)))
+
+
+async def run(handler, **options):
+    async with open_session() as session:
+        return await handler(session, **options)
+
+
+if __name__ == '__main__':
+    main()
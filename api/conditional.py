@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import blake2b
+from typing import Optional
+
+from fastapi import Request, Response
+
+from api.settings import get_settings
+
+settings = get_settings()
+
+
+def entity_tag(*parts) -> str:
+    """Strong ETag over the values a representation is built from."""
+    digest = blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(moment: datetime) -> str:
+    # Timestamps are stored naive, in UTC.
+    return format_datetime(moment.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def cache_control_headers(route: str) -> dict[str, str]:
+    if route not in settings.CACHE_CONTROL:
+        return {}
+
+    return {'Cache-Control': settings.CACHE_CONTROL[route]}
+
+
+def cache_headers(
+    route: str, etag: str, last_modified: Optional[datetime]
+) -> dict[str, str]:
+    headers = {'ETag': etag, **cache_control_headers(route)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    return headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """
+    Whether the client's copy is current, per RFC 9110 section 13.2.2.
+
+    If-Modified-Since is only consulted when no If-None-Match was sent,
+    since one-second dates cannot tell apart changes an ETag can.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+
+        return etag in {
+            tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+        }
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+
+    modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return modified <= since
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def cache_control(route: str):
+    """Dependency setting the Cache-Control configured for `route`."""
+
+    def dependency(response: Response):
+        response.headers.update(cache_control_headers(route))
+
+    return dependency
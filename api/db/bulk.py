@@ -0,0 +1,196 @@
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+from slugify import slugify
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.models import Article, utcnow
+from api.db.schemas import ArticleInput, BulkImportError, BulkImportResult
+from api.db.tags import link_many_tags, tag_names
+from api.db.timeline import fan_out
+from api.response_cache import invalidate_articles
+from api.security import Principal
+from api.settings import get_settings
+
+settings = get_settings()
+
+
+async def ndjson_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[tuple[int, Optional[bytes]]]:
+    """
+    Split a byte stream into its non-blank lines, numbered from 1.
+
+    A line longer than `max_line_bytes` is yielded as None; its bytes are
+    dropped as they arrive instead of being buffered.
+    """
+    buffer = bytearray()
+    number = 0
+    too_long = False
+
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b'\n', start)) != -1:
+            number += 1
+            if not too_long:
+                buffer += chunk[start:end]
+            if too_long or len(buffer) > max_line_bytes:
+                yield number, None
+            elif buffer.strip():
+                yield number, bytes(buffer)
+            buffer.clear()
+            too_long = False
+            start = end + 1
+
+        if not too_long:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                too_long = True
+                buffer.clear()
+
+    if too_long:
+        yield number + 1, None
+    elif buffer.strip():
+        yield number + 1, bytes(buffer)
+
+
+def describe(error: ValidationError) -> str:
+    return '; '.join(
+        ': '.join(filter(None, ['.'.join(map(str, item['loc'])), item['msg']]))
+        for item in error.errors()
+    )
+
+
+class ImportReport:
+    """Outcome of a bulk import, keeping at most `max_errors` errors."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[BulkImportError] = []
+
+    def fail(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(BulkImportError(line=line, error=error))
+
+    def result(self) -> BulkImportResult:
+        return BulkImportResult(
+            imported=self.imported,
+            failed=self.failed,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors),
+        )
+
+
+async def write_batch(
+    session: AsyncSession,
+    author: Principal,
+    batch: list[tuple[int, ArticleInput]],
+    report: ImportReport,
+):
+    """
+    Insert a batch of articles with their tags in one transaction.
+
+    Articles whose slug is taken, in the database or earlier in the batch,
+    are reported and skipped. Should the transaction fail anyway, every
+    article of the batch is reported and the import goes on.
+    """
+    articles: dict[str, tuple[int, ArticleInput]] = {}
+    for line, article in batch:
+        slug = slugify(article.title)
+        if not slug:
+            report.fail(line, 'Article title has no letters or digits')
+        elif slug in articles:
+            report.fail(line, 'Article title already used')
+        else:
+            articles[slug] = (line, article)
+
+    taken = await session.scalars(
+        select(Article.slug).where(Article.slug.in_(articles))
+    )
+    for slug in taken:
+        report.fail(articles.pop(slug)[0], 'Article title already used')
+
+    if not articles:
+        return
+
+    now = utcnow()
+    tags = {
+        slug: tag_names(article.tag_list or [])
+        for slug, (_, article) in articles.items()
+    }
+    try:
+        await session.execute(
+            insert(Article),
+            [
+                {
+                    'slug': slug,
+                    'title': article.title,
+                    'description': article.description,
+                    'body': article.body,
+                    'created_at': now,
+                    'updated_at': now,
+                    'user_id': author.id,
+                }
+                for slug, (_, article) in articles.items()
+            ],
+        )
+        await link_many_tags(session, tags)
+        await fan_out(session, author.id, list(articles))
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        for line, _ in articles.values():
+            report.fail(line, 'Article conflicts with a concurrent write')
+        return
+
+    report.imported += len(articles)
+    await invalidate_articles(
+        ['all', f'author:{author.username}']
+        + [f'tag:{name}' for name in set().union(*tags.values())]
+    )
+
+
+async def import_articles(
+    session: AsyncSession,
+    author: Principal,
+    lines: AsyncIterator[tuple[int, Optional[bytes]]],
+    batch_size: int,
+) -> BulkImportResult:
+    """
+    Create an article for every NDJSON line of `lines`.
+
+    Lines are validated as they are read and written `batch_size` at a
+    time, so only one batch is held in memory. A line that is not a valid
+    article is reported and skipped without affecting the others.
+    """
+    report = ImportReport(settings.BULK_IMPORT_MAX_ERRORS)
+    batch: list[tuple[int, ArticleInput]] = []
+
+    async for number, line in lines:
+        if line is None:
+            report.fail(
+                number,
+                f'Line longer than {settings.BULK_IMPORT_MAX_LINE_BYTES} '
+                'bytes',
+            )
+            continue
+
+        try:
+            batch.append((number, ArticleInput.model_validate_json(line)))
+        except ValidationError as error:
+            report.fail(number, describe(error))
+            continue
+
+        if len(batch) >= batch_size:
+            await write_batch(session, author, batch, report)
+            batch = []
+
+    if batch:
+        await write_batch(session, author, batch, report)
+
+    return report.result()
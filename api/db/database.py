@@ -1,11 +1,229 @@
-from sqlalchemy import create_engine
+from time import perf_counter
+from typing import Optional, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from api.instrumentation import instrument
+from api.settings import get_settings
+
+settings = get_settings()
+
+
+class InstrumentedPool:
+    """Pool mixin recording how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        started = perf_counter()
+        connection = super().connect()
+        waited = perf_counter() - started
+
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        return connection
+
+    def stats(self) -> dict:
+        return {
+            'size': self.size(),
+            'checked_out': self.checkedout(),
+            'overflow': self.overflow(),
+            'checkouts': self.checkouts,
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_max': self.wait_seconds_max,
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+def build_engine(url: str, create=create_engine, poolclass=QueuePool):
+    options = {}
+    if make_url(url).database not in (None, '', ':memory:'):
+        options = {
+            'poolclass': poolclass,
+            'pool_size': settings.DB_POOL_SIZE,
+            'max_overflow': settings.DB_MAX_OVERFLOW,
+            'pool_timeout': settings.DB_POOL_TIMEOUT,
+            'pool_pre_ping': settings.DB_POOL_PRE_PING,
+            'pool_recycle': settings.DB_POOL_RECYCLE,
+        }
+
+    db_engine = create(url, **options)
+
+    sync_engine = getattr(db_engine, 'sync_engine', db_engine)
+    instrument(sync_engine)
+    if sync_engine.dialect.name == 'sqlite':
+        event.listen(sync_engine, 'connect', apply_sqlite_pragmas)
+
+    return db_engine
+
+
+def async_url(url: str) -> str:
+    """`url` with the async driver, for sqlite URLs without one."""
+    return url.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+
+
+engine = build_engine(settings.DB_URL, poolclass=InstrumentedQueuePool)
+
+async_engine = None
+if settings.DB_ASYNC:
+    async_engine = build_engine(
+        settings.DB_ASYNC_URL or async_url(settings.DB_URL),
+        create=create_async_engine,
+        poolclass=InstrumentedAsyncQueuePool,
+    )
+
+
+def pool_stats() -> dict:
+    """Checkout and usage figures of the pool the sessions draw from."""
+    pool = (async_engine.sync_engine if async_engine else engine).pool
+    if not isinstance(pool, InstrumentedPool):
+        return {}
+
+    return pool.stats()
+
+
+async def warm_pool(connections: int):
+    """Open `connections` connections now and leave them in the pool."""
+    if async_engine is not None:
+        opened = [await async_engine.connect() for _ in range(connections)]
+        for connection in opened:
+            await connection.close()
+        return
+
+    def open_and_return():
+        opened = [engine.connect() for _ in range(connections)]
+        for connection in opened:
+            connection.close()
+
+    await run_in_threadpool(open_and_return)
+
+
+class ThreadedSession:
+    """
+    Drive a sync `Session` from async code.
+
+    Exposes the part of the `AsyncSession` API the routes use and runs
+    every call that may hit the database in the threadpool, so the sync
+    driver can be benchmarked against the async one with the same routes.
+    """
+
+    def __init__(self, sync_session: Session):
+        self.sync_session = sync_session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await run_in_threadpool(self.sync_session.close)
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.execute, *args, **kwargs
+        )
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalar, *args, **kwargs
+        )
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalars, *args, **kwargs
+        )
+
+    async def stream(self, *args, **kwargs):
+        result = await run_in_threadpool(
+            self.sync_session.execute, *args, **kwargs
+        )
+        return ThreadedResult(result)
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await run_in_threadpool(
+            self.sync_session.refresh, instance, *args, **kwargs
+        )
+
+    async def flush(self, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.flush, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+class ThreadedResult:
+    """Fetch from a sync `Result` in the threadpool, like `AsyncResult`."""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size: Optional[int] = None):
+        partitions = self.result.partitions(size)
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                return
+            yield partition
+
+
+def session_for(db_engine: Union[Engine, AsyncEngine]):
+    # Lazy loads cannot run outside the greenlet of an AsyncSession, so
+    # objects are not expired on commit in either mode.
+    if isinstance(db_engine, AsyncEngine):
+        return AsyncSession(db_engine, expire_on_commit=False)
+
+    return ThreadedSession(Session(db_engine, expire_on_commit=False))
 
-from api.settings import Settings
 
-engine = create_engine(Settings().DB_URL)
+def open_session():
+    return session_for(async_engine or engine)
 
 
-def get_session():
-    with Session(engine) as session:
+async def get_session():
+    async with open_session() as session:
         yield session
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from typing import Optional, Sequence
+
+from sqlalchemy import select
+
+from api.db.loader import Loader
+from api.db.models import Article, Favorites, TagArticle
+from api.db.schemas import Profile, PublicArticleSchema
+from api.security import Principal
+from api.serialization import build
+
+
+async def hydrate_articles(
+    loader: Loader,
+    articles: Sequence[Article],
+    current_user: Optional[Principal] = None,
+) -> list[PublicArticleSchema]:
+    """
+    Build the public representation of a page of articles.
+
+    Tags and authors are fetched with one query each for the whole page,
+    plus two more for the viewer's follows and favorites when someone is
+    logged in, so the number of round-trips does not grow with the page
+    size. Authors and follows the request already read are not fetched
+    again.
+    """
+    if not articles:
+        return []
+
+    session = loader.session
+    slugs = [article.slug for article in articles]
+    article_ids = {article.id for article in articles}
+    author_ids = [article.user_id for article in articles]
+    viewer_id = current_user.id if current_user else None
+
+    tags = defaultdict(list)
+    for article_slug, tag_name in await session.execute(
+        select(TagArticle.article_slug, TagArticle.tag_name).where(
+            TagArticle.article_slug.in_(slugs)
+        )
+    ):
+        tags[article_slug].append(tag_name)
+
+    authors = await loader.load_many_users(author_ids)
+    following = await loader.is_following(viewer_id, author_ids)
+
+    favorited = set()
+    if current_user:
+        favorited = set(
+            await session.scalars(
+                select(Favorites.article_id).where(
+                    Favorites.favorited_by_user == current_user.username,
+                    Favorites.article_id.in_(article_ids),
+                )
+            )
+        )
+
+    articles_list = []
+
+    for article in articles:
+        author = authors[article.user_id]
+
+        profile = build(
+            Profile,
+            username=author.username,
+            bio=author.bio,
+            image=author.image,
+            email=author.email,
+            following=following[author.id],
+        )
+        article_response: PublicArticleSchema = build(
+            PublicArticleSchema,
+            slug=article.slug,
+            title=article.title,
+            description=article.description,
+            body=article.body,
+            tag_list=tags[article.slug],
+            created_at=article.created_at,
+            updated_at=article.updated_at,
+            favorited=article.id in favorited,
+            favorites_count=article.favorites_count,
+            comments_count=article.comments_count,
+            author=profile,
+        )
+
+        articles_list.append(article_response)
+
+    return articles_list
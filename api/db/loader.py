@@ -0,0 +1,121 @@
+from typing import Iterable, Optional
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.database import get_session
+from api.db.models import Follow, User
+from api.db.replicas import get_read_session
+from api.instrumentation import query_stats
+
+
+class Loader:
+    """
+    Users and follows read during one request, each fetched once.
+
+    Lookups are answered from what the request already read, and those
+    made together go to the database as one query. Every lookup that does
+    not cost a query of its own is counted in the request's QueryStats as
+    a round-trip saved.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.users: dict[int, Optional[User]] = {}
+        self.user_ids: dict[str, Optional[int]] = {}
+        self.follows: dict[tuple[int, int], bool] = {}
+
+    def record_saved(self, lookups: int, queries: int):
+        stats = query_stats.get()
+        if stats is not None:
+            stats.saved += lookups - queries
+
+    def prime(self, user: User):
+        """Keep a user the request read by other means."""
+        self.users[user.id] = user
+        if user.deleted_at is None:
+            self.user_ids[user.username] = user.id
+
+    async def load_user(self, id: int) -> Optional[User]:
+        return (await self.load_many_users([id]))[id]
+
+    async def load_many_users(
+        self, ids: Iterable[int]
+    ) -> dict[int, Optional[User]]:
+        """The users `ids`, None for those that do not exist."""
+        ids = list(ids)
+        missing = {id for id in ids if id not in self.users}
+        if missing:
+            for user in await self.session.scalars(
+                select(User).where(User.id.in_(missing))
+            ):
+                self.prime(user)
+            for id in missing - self.users.keys():
+                self.users[id] = None
+
+        self.record_saved(len(ids), bool(missing))
+        return {id: self.users[id] for id in ids}
+
+    async def load_user_by_username(self, username: str) -> Optional[User]:
+        """The user `username`, unless deleted."""
+        if username in self.user_ids:
+            self.record_saved(1, 0)
+            id = self.user_ids[username]
+            return None if id is None else self.users[id]
+
+        user = await self.session.scalar(
+            select(User).where(
+                User.username == username, User.deleted_at.is_(None)
+            )
+        )
+        if user is None:
+            self.user_ids[username] = None
+        else:
+            self.prime(user)
+        return user
+
+    async def is_following(
+        self, viewer_id: Optional[int], author_ids: Iterable[int]
+    ) -> dict[int, bool]:
+        """Whether `viewer_id` follows each of `author_ids`."""
+        author_ids = list(author_ids)
+        if viewer_id is None:
+            return {author_id: False for author_id in author_ids}
+
+        missing = {
+            author_id
+            for author_id in author_ids
+            if (viewer_id, author_id) not in self.follows
+        }
+        if missing:
+            followed = set(
+                await self.session.scalars(
+                    select(Follow.following_id).where(
+                        Follow.user_id == viewer_id,
+                        Follow.following_id.in_(missing),
+                    )
+                )
+            )
+            for author_id in missing:
+                self.follows[viewer_id, author_id] = author_id in followed
+
+        self.record_saved(len(author_ids), bool(missing))
+        return {
+            author_id: self.follows[viewer_id, author_id]
+            for author_id in author_ids
+        }
+
+    def set_following(self, viewer_id: int, author_id: int, following: bool):
+        """Record a follow or unfollow the request made."""
+        self.follows[viewer_id, author_id] = following
+
+
+def get_loader(session: AsyncSession = Depends(get_session)) -> Loader:
+    return Loader(session)
+
+
+def get_read_loader(
+    session: AsyncSession = Depends(get_read_session),
+) -> Loader:
+    return Loader(session)
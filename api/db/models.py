@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -9,8 +9,17 @@ class Base(DeclarativeBase):
     pass
 
 
+def utcnow() -> datetime:
+    # Unlike CURRENT_TIMESTAMP this keeps sub-second precision, so two
+    # updates within a second still leave different versions behind.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Follow(Base):
     __tablename__ = 'association_table'
+    __table_args__ = (
+        Index('ix_association_table_following_id', 'following_id'),
+    )
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey('users.id'), primary_key=True
@@ -26,11 +35,14 @@ class User(Base):
     __tablename__ = 'users'
 
     id: Mapped[int] = mapped_column(default=None, primary_key=True)
-    username: Mapped[str]
-    email: Mapped[str]
+    username: Mapped[str] = mapped_column(unique=True, index=True)
+    email: Mapped[str] = mapped_column(unique=True, index=True)
     password: Mapped[str]
     bio: Mapped[Optional[str]]
     image: Mapped[Optional[str]]
+    followers_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    # Set when the account is closed and its rows are still being purged.
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(default=None)
     following: Mapped[List['Follow']] = relationship(
         back_populates='user', cascade='all, delete-orphan'
     )
@@ -51,6 +63,9 @@ class Following(Base):
 
 class TagArticle(Base):
     __tablename__ = 'tags_article'
+    __table_args__ = (
+        Index('ix_tags_article_tag_name', 'tag_name', 'article_slug'),
+    )
 
     article_slug: Mapped[str] = mapped_column(
         ForeignKey('articles.slug'), primary_key=True
@@ -64,14 +79,24 @@ class TagArticle(Base):
 
 class Article(Base):
     __tablename__ = 'articles'
+    __table_args__ = (
+        Index('ix_articles_created_at_id', 'created_at', 'id'),
+        Index('ix_articles_user_id_created_at', 'user_id', 'created_at', 'id'),
+        Index('ix_articles_updated_at_id', 'updated_at', 'id'),
+        # Never hand out the id of a deleted article again: cursors, ETags
+        # and cache tags may still hold it.
+        {'sqlite_autoincrement': True},
+    )
 
-    id: Mapped[int] = mapped_column(default=True, autoincrement=True)
-    slug: Mapped[str] = mapped_column(default=None, primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    slug: Mapped[str] = mapped_column(unique=True, index=True)
     title: Mapped[str]
     description: Mapped[str]
     body: Mapped[str]
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(onupdate=func.now())
+    updated_at: Mapped[datetime] = mapped_column(onupdate=utcnow)
+    favorites_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    comments_count: Mapped[int] = mapped_column(default=0, server_default='0')
     tag_list: Mapped[Optional[List['TagArticle']]] = relationship(
         back_populates='articles', cascade='all, delete-orphan'
     )
@@ -85,6 +110,27 @@ class Article(Base):
     )
 
 
+class Timeline(Base):
+    __tablename__ = 'timelines'
+    __table_args__ = (
+        Index(
+            'ix_timelines_user_id_created_at',
+            'user_id',
+            'created_at',
+            'article_id',
+        ),
+        Index('ix_timelines_article_id', 'article_id'),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id'), primary_key=True
+    )
+    article_id: Mapped[int] = mapped_column(
+        ForeignKey('articles.id'), primary_key=True
+    )
+    created_at: Mapped[datetime]
+
+
 class Tag(Base):
     __tablename__ = 'tags'
 
@@ -94,8 +140,27 @@ class Tag(Base):
     )
 
 
+class TagStats(Base):
+    __tablename__ = 'tag_stats'
+    __table_args__ = (
+        Index('ix_tag_stats_articles_count', 'articles_count', 'name'),
+    )
+
+    name: Mapped[str] = mapped_column(
+        ForeignKey('tags.name'), primary_key=True
+    )
+    articles_count: Mapped[int] = mapped_column(default=0)
+
+
 class Favorites(Base):
     __tablename__ = 'favorite_association'
+    __table_args__ = (
+        Index(
+            'ix_favorite_association_favorited_by_user',
+            'favorited_by_user',
+            'article_id',
+        ),
+    )
 
     # article_slug: Mapped[str] = mapped_column(
     #     ForeignKey("articles.slug"), primary_key=True
@@ -134,11 +199,15 @@ class Comment(Base):
         back_populates='comment', cascade='all, delete-orphan'
     )
     author: Mapped['User'] = relationship(back_populates='comments')
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), index=True)
 
 
 class PostComment(Base):
     __tablename__ = 'comment_association'
+    __table_args__ = (
+        Index('ix_comment_association_comment_id', 'comment_id'),
+    )
+
     article_slug: Mapped[str] = mapped_column(
         ForeignKey('articles.slug'), primary_key=True
     )
@@ -0,0 +1,90 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Select, String, tuple_, type_coerce
+
+MAX_LIMIT = 100
+MAX_OFFSET = 1000
+
+# Largest integer a database bind accepts.
+MAX_KEY_INT = 2**63 - 1
+
+
+def encode_cursor(*values) -> str:
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(urlsafe_b64decode(cursor + padding))
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != 2:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+    # The values are bound as they are, so only scalars may reach the query.
+    if not all(map(is_key_value, values)):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+    return values
+
+
+def is_key_value(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -MAX_KEY_INT - 1 <= value <= MAX_KEY_INT
+    return value is None or isinstance(value, (str, float))
+
+
+def seek(
+    query: Select,
+    created_at,
+    id,
+    cursor: Optional[str],
+    limit: int,
+    offset: int = 0,
+) -> Select:
+    """
+    Order `query` newest first on `(created_at, id)` and start it right
+    after `cursor`.
+
+    The key is compared as stored, so an index on both columns turns every
+    page into the same range scan. One extra row is fetched so `page` can
+    tell whether there is a next one; `offset` is only honoured without a
+    cursor.
+    """
+    created_at_key = type_coerce(created_at, String)
+    query = query.add_columns(
+        created_at_key.label('cursor_created_at'), id.label('cursor_id')
+    )
+
+    if cursor:
+        query = query.where(
+            tuple_(created_at_key, id) < tuple_(*decode_cursor(cursor))
+        )
+    elif offset:
+        query = query.offset(offset)
+
+    return query.order_by(created_at.desc(), id.desc()).limit(limit + 1)
+
+
+def page(rows, limit: int) -> tuple[list, Optional[str]]:
+    """
+    Split the rows of a `seek` query into items and the next cursor.
+
+    The item is the first column of each row; the key is made of the two
+    columns `seek` appends last.
+    """
+    items = [row[0] for row in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(*rows[limit - 1][-2:])
+
+    return items, next_cursor
@@ -0,0 +1,264 @@
+from collections import Counter
+from functools import partial
+from typing import Optional, Sequence, Union
+
+from sqlalchemy import Select, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.database import open_session
+from api.db.models import (
+    Article,
+    Comment,
+    Favorites,
+    Follow,
+    PostComment,
+    TagArticle,
+    Timeline,
+    User,
+)
+from api.db.tags import count_tags
+from api.db.timeline import catch_up, retract
+from api.response_cache import article_list_cache
+from api.settings import get_settings
+
+settings = get_settings()
+
+# Either the ids themselves or a query selecting them.
+Ids = Union[Sequence[int], Select]
+
+# ORM-enabled bulk statements would otherwise look for the matching
+# objects in the session, which is only worth it for plain criteria.
+BULK = {'synchronize_session': False}
+
+
+async def delete_articles(session: AsyncSession, ids: Ids) -> list[str]:
+    """
+    Delete articles with their comments, tags, favorites and timeline
+    entries, one statement per table. Returns the tag names they had.
+    """
+    slugs = select(Article.slug).where(Article.id.in_(ids))
+
+    tags = Counter(
+        dict(
+            (
+                await session.execute(
+                    select(TagArticle.tag_name, func.count())
+                    .where(TagArticle.article_slug.in_(slugs))
+                    .group_by(TagArticle.tag_name)
+                )
+            ).all()
+        )
+    )
+    await count_tags(session, removed=tags)
+
+    comment_ids = select(PostComment.comment_id).where(
+        PostComment.article_slug.in_(slugs)
+    )
+    await session.execute(
+        delete(Comment).where(Comment.id.in_(comment_ids)),
+        execution_options=BULK,
+    )
+    await session.execute(
+        delete(PostComment).where(PostComment.article_slug.in_(slugs)),
+        execution_options=BULK,
+    )
+    await session.execute(
+        delete(TagArticle).where(TagArticle.article_slug.in_(slugs)),
+        execution_options=BULK,
+    )
+    await session.execute(
+        delete(Favorites).where(Favorites.article_id.in_(ids)),
+        execution_options=BULK,
+    )
+    await retract(session, ids)
+    await session.execute(
+        delete(Article).where(Article.id.in_(ids)), execution_options=BULK
+    )
+
+    return list(tags)
+
+
+async def delete_comments(session: AsyncSession, ids: Ids):
+    """Delete comments, keeping their articles' comments_count right."""
+    links = select(PostComment.article_slug).where(
+        PostComment.comment_id.in_(ids)
+    )
+    await session.execute(
+        update(Article)
+        .where(Article.slug.in_(links))
+        .values(
+            comments_count=Article.comments_count
+            - select(func.count())
+            .where(
+                PostComment.article_slug == Article.slug,
+                PostComment.comment_id.in_(ids),
+            )
+            .scalar_subquery(),
+            # A counter is not an edit: keep updated_at's onupdate off.
+            updated_at=Article.updated_at,
+        ),
+        execution_options=BULK,
+    )
+    await session.execute(
+        delete(PostComment).where(PostComment.comment_id.in_(ids)),
+        execution_options=BULK,
+    )
+    await session.execute(
+        delete(Comment).where(Comment.id.in_(ids)), execution_options=BULK
+    )
+
+
+async def delete_favorites(session: AsyncSession, ids: Ids, username: str):
+    """Drop `username`'s favorites of the articles `ids`."""
+    await session.execute(
+        update(Article)
+        .where(Article.id.in_(ids))
+        .values(
+            favorites_count=Article.favorites_count - 1,
+            updated_at=Article.updated_at,
+        ),
+        execution_options=BULK,
+    )
+    await session.execute(
+        delete(Favorites).where(
+            Favorites.favorited_by_user == username,
+            Favorites.article_id.in_(ids),
+        ),
+        execution_options=BULK,
+    )
+
+
+async def delete_follows(session: AsyncSession, ids: Ids, user_id: int):
+    """Drop the follows of users `ids` by `user_id`."""
+    await session.execute(
+        update(User)
+        .where(User.id.in_(ids))
+        .values(followers_count=User.followers_count - 1),
+        execution_options=BULK,
+    )
+    # While `ids` still selects them; what it adds to `user_id`'s own
+    # timeline goes with the rest of it.
+    await catch_up(session, ids)
+    await session.execute(
+        delete(Follow).where(
+            Follow.user_id == user_id, Follow.following_id.in_(ids)
+        ),
+        execution_options=BULK,
+    )
+
+
+async def delete_followers(session: AsyncSession, ids: Ids, user_id: int):
+    """Drop the follows of `user_id` by users `ids`."""
+    await session.execute(
+        delete(Follow).where(
+            Follow.following_id == user_id, Follow.user_id.in_(ids)
+        ),
+        execution_options=BULK,
+    )
+
+
+async def delete_timeline(session: AsyncSession, ids: Ids, user_id: int):
+    await session.execute(
+        delete(Timeline).where(
+            Timeline.user_id == user_id, Timeline.article_id.in_(ids)
+        ),
+        execution_options=BULK,
+    )
+
+
+def user_rows(user_id: int, username: str):
+    """Queries selecting what a user owns, with what deletes it."""
+    return [
+        (
+            select(Article.id).where(Article.user_id == user_id),
+            delete_articles,
+        ),
+        (
+            select(Comment.id).where(Comment.user_id == user_id),
+            delete_comments,
+        ),
+        (
+            select(Favorites.article_id).where(
+                Favorites.favorited_by_user == username
+            ),
+            partial(delete_favorites, username=username),
+        ),
+        (
+            select(Follow.following_id).where(Follow.user_id == user_id),
+            partial(delete_follows, user_id=user_id),
+        ),
+        (
+            select(Follow.user_id).where(Follow.following_id == user_id),
+            partial(delete_followers, user_id=user_id),
+        ),
+        (
+            select(Timeline.article_id).where(Timeline.user_id == user_id),
+            partial(delete_timeline, user_id=user_id),
+        ),
+    ]
+
+
+async def count_user_rows(
+    session: AsyncSession, user_id: int, username: str, limit: int
+) -> int:
+    """
+    How many rows deleting a user deletes directly.
+
+    Each kind of row is counted up to `limit` only, which is enough to
+    tell whether a user is over a threshold of `limit`.
+    """
+    return await session.scalar(
+        select(
+            sum(
+                select(func.count())
+                .select_from(query.limit(limit).subquery())
+                .scalar_subquery()
+                for query, _ in user_rows(user_id, username)
+            )
+        )
+    )
+
+
+async def delete_user(
+    session: AsyncSession,
+    user_id: int,
+    username: str,
+    chunk_size: Optional[int] = None,
+    after_commit=None,
+):
+    """
+    Delete a user and everything they own or did, counters included.
+
+    Without `chunk_size` every table is handled by one set-based
+    statement and nothing is committed. With it, rows are deleted and
+    committed `chunk_size` at a time, so the write lock is never held for
+    long; `after_commit` is awaited after each commit.
+    """
+    for query, remove in user_rows(user_id, username):
+        if chunk_size is None:
+            await remove(session, query)
+            continue
+
+        while ids := (await session.scalars(query.limit(chunk_size))).all():
+            await remove(session, ids)
+            await session.commit()
+            if after_commit is not None:
+                await after_commit()
+
+    await session.execute(
+        delete(User).where(User.id == user_id), execution_options=BULK
+    )
+
+
+async def purge_user(user_id: int, username: str):
+    """Delete a soft-deleted user in chunks, in a session of its own."""
+    async with open_session() as session:
+        await delete_user(
+            session,
+            user_id,
+            username,
+            chunk_size=settings.USER_PURGE_CHUNK_SIZE,
+            after_commit=article_list_cache.clear,
+        )
+        await session.commit()
+    await article_list_cache.clear()
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import sqlite3
+from itertools import count
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api.db.database import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedPool,
+    InstrumentedQueuePool,
+    async_url,
+    build_engine,
+    open_session,
+    session_for,
+)
+from api.db.models import User
+from api.settings import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger('api.replicas')
+
+# Set on successful responses to writes; while the client sends it back,
+# its reads go to the primary.
+READ_PRIMARY_COOKIE = 'read_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA query_only = ON')
+    cursor.close()
+
+
+class Replica:
+    """A read-only copy of the database, and whether it answers."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        if settings.DB_ASYNC:
+            self.engine = build_engine(
+                async_url(url),
+                create=create_async_engine,
+                poolclass=InstrumentedAsyncQueuePool,
+            )
+        else:
+            self.engine = build_engine(url, poolclass=InstrumentedQueuePool)
+
+        sync_engine = getattr(self.engine, 'sync_engine', self.engine)
+        if sync_engine.dialect.name == 'sqlite':
+            # A write sent here by mistake fails instead of diverging.
+            event.listen(sync_engine, 'connect', query_only)
+
+        self.healthy = True
+        self.error: Optional[str] = None
+
+    async def check(self):
+        # Reads a table, as opening a missing SQLite file succeeds.
+        try:
+            async with session_for(self.engine) as session:
+                await asyncio.wait_for(
+                    session.execute(select(User.id).limit(1)),
+                    settings.DB_REPLICA_HEALTH_CHECK_SECONDS,
+                )
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as error:
+            self.mark_down(error)
+            return
+
+        if not self.healthy:
+            logger.warning('Replica %s is back up', self.name)
+        self.healthy = True
+        self.error = None
+
+    def mark_down(self, error: Exception):
+        if self.healthy:
+            logger.warning('Replica %s is down: %s', self.name, error)
+        self.healthy = False
+        self.error = str(error) or type(error).__name__
+
+    def stats(self) -> dict:
+        pool = getattr(self.engine, 'sync_engine', self.engine).pool
+        return {
+            'healthy': self.healthy,
+            'error': self.error,
+            'pool': pool.stats() if isinstance(pool, InstrumentedPool) else {},
+        }
+
+
+class ReplicaSet:
+    """Replicas taken in turn, skipping those failing their check."""
+
+    def __init__(self, urls: list[str]):
+        self.replicas = [
+            Replica(f'replica-{index}', url) for index, url in enumerate(urls)
+        ]
+        self.turns = count()
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+
+        return healthy[next(self.turns) % len(healthy)]
+
+    async def check(self):
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def keep_checking(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_CHECK_SECONDS)
+
+    def stats(self) -> dict:
+        return {replica.name: replica.stats() for replica in self.replicas}
+
+
+replicas = ReplicaSet(settings.DB_REPLICA_URLS)
+
+
+async def get_read_session(request: Request):
+    """
+    A session for routes that only read: on the next healthy replica, or
+    on the primary when there is none or the client wrote recently.
+
+    A replica failing a statement is skipped until its next health check.
+    """
+    replica = None
+    if READ_PRIMARY_COOKIE not in request.cookies:
+        replica = replicas.pick()
+
+    if replica is None:
+        async with open_session() as session:
+            yield session
+        return
+
+    async with session_for(replica.engine) as session:
+        try:
+            yield session
+        except OperationalError as error:
+            replica.mark_down(error)
+            raise
+
+
+class ReadYourWritesMiddleware:
+    """
+    Send clients to the primary for a while after they write.
+
+    Successful responses to unsafe methods set a cookie lasting
+    DB_READ_YOUR_WRITES_SECONDS, which keeps `get_read_session` off the
+    replicas, so the client reads what it wrote whatever their lag.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (
+            f'{READ_PRIMARY_COOKIE}=1; '
+            f'Max-Age={settings.DB_READ_YOUR_WRITES_SECONDS}; '
+            'Path=/; HttpOnly; SameSite=Lax'
+        ).encode('latin-1')
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] != 'http'
+            or scope['method'] in SAFE_METHODS
+            or not replicas.replicas
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if (
+                message['type'] == 'http.response.start'
+                and message['status'] < 400
+            ):
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'set-cookie', self.cookie),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def copy_sqlite(source: str, target: str):
+    """
+    Copy the SQLite database `source` over `target` with the online
+    backup API.
+
+    Writers to `source` are not blocked, and readers of `target` see the
+    previous copy or the new one, never a mix of both.
+    """
+    origin = sqlite3.connect(source)
+    copy = sqlite3.connect(target, timeout=30)
+    try:
+        origin.backup(copy)
+    finally:
+        copy.close()
+        origin.close()
@@ -95,12 +95,37 @@ class PublicArticleSchema(CustomBaseModel):
     updated_at: datetime
     favorited: bool = False
     favorites_count: int
+    comments_count: int = 0
     author: Profile
 
 
 class MultArticle(CustomBaseModel):
     articles: list[PublicArticleSchema]
     articles_count: int
+    next_cursor: Optional[str] = None
+
+
+class PublicComment(CustomBaseModel):
+    id: int
+    body: str
+    created_at: datetime
+    updated_at: datetime
+    author: Profile
+
+
+class MultComment(CustomBaseModel):
+    comments: list[PublicComment]
+    next_cursor: Optional[str] = None
+
+
+class SearchArticle(PublicArticleSchema):
+    snippet: str
+
+
+class SearchResults(CustomBaseModel):
+    articles: list[SearchArticle]
+    articles_count: int
+    next_cursor: Optional[str] = None
 
 
 class ArticleInput(CustomBaseModel):
@@ -110,6 +135,19 @@ class ArticleInput(CustomBaseModel):
     tag_list: Optional[list[str]] = []
 
 
+class BulkImportError(CustomBaseModel):
+    line: int
+    error: str
+
+
+class BulkImportResult(CustomBaseModel):
+    imported: int
+    failed: int
+    errors: list[BulkImportError]
+    # Set once more lines failed than are listed in `errors`.
+    errors_truncated: bool = False
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
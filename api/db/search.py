@@ -0,0 +1,135 @@
+import re
+from typing import Optional
+
+from sqlalchemy import DDL, event, func, literal_column, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import column, table
+
+from api.db.models import Article
+from api.db.pagination import decode_cursor, encode_cursor
+
+# External content table: the text lives in `articles` only and the index
+# is keyed by `articles.id`, kept in sync by the triggers below.
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE articles_fts USING fts5(
+        title, description, body,
+        content='articles', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts (
+            articles_fts, rowid, title, description, body
+        ) VALUES ('delete', old.id, old.title, old.description, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER articles_fts_update
+    AFTER UPDATE OF id, title, description, body ON articles BEGIN
+        INSERT INTO articles_fts (
+            articles_fts, rowid, title, description, body
+        ) VALUES ('delete', old.id, old.title, old.description, old.body);
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """,
+]
+
+for statement in FTS_DDL:
+    event.listen(
+        Article.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+event.listen(
+    Article.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS articles_fts').execute_if(dialect='sqlite'),
+)
+
+articles_fts = table('articles_fts', column('rowid'))
+
+# bm25 weights of title, description and body, in that order.
+WEIGHTS = (10.0, 5.0, 1.0)
+SNIPPET_TOKENS = 24
+
+
+def match_expression(q: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching every word.
+
+    Each word is quoted, so operators and stray punctuation in the input
+    are searched for rather than parsed.
+    """
+    words = re.findall(r'\w+', q)
+    if not words:
+        return None
+
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_query(expression: str, cursor: Optional[str], limit: int):
+    """Select matching articles with their snippet and `(rank, id)` key."""
+    fts = literal_column('articles_fts')
+    hits = (
+        select(
+            articles_fts.c.rowid.label('article_id'),
+            func.bm25(fts, *WEIGHTS).label('rank'),
+            func.snippet(
+                fts, -1, '<mark>', '</mark>', '…', SNIPPET_TOKENS
+            ).label('snippet'),
+        )
+        .where(fts.op('MATCH')(expression))
+        .subquery()
+    )
+
+    query = select(Article, hits.c.snippet, hits.c.rank, hits.c.article_id)
+    query = query.join(hits, hits.c.article_id == Article.id)
+
+    if cursor:
+        query = query.where(
+            tuple_(hits.c.rank, hits.c.article_id)
+            > tuple_(*decode_cursor(cursor))
+        )
+
+    return query.order_by(hits.c.rank, hits.c.article_id).limit(limit + 1)
+
+
+async def search_articles(
+    session: AsyncSession, q: str, cursor: Optional[str], limit: int
+) -> tuple[list[tuple[Article, str]], Optional[str]]:
+    """
+    Read a page of articles matching `q`, best match first.
+
+    Returns each article with a snippet of its best matching column.
+    Pages are keyed on `(rank, id)`; ranks shift a little as the corpus
+    grows, so a page boundary is only as stable as the scores around it.
+    """
+    expression = match_expression(q)
+    if expression is None:
+        return [], None
+
+    result = await session.execute(search_query(expression, cursor, limit))
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(*rows[limit - 1][2:])
+
+    return [(row[0], row[1]) for row in rows[:limit]], next_cursor
+
+
+async def rebuild(session: AsyncSession):
+    """Reindex every article from the `articles` table."""
+    await session.execute(
+        text("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+    )
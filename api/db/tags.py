@@ -0,0 +1,107 @@
+from collections import Counter
+from typing import Iterable, Mapping, Sequence
+
+from slugify import slugify
+from sqlalchemy import case, delete, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.models import Tag, TagArticle, TagStats
+
+
+def tag_names(tag_list: Iterable[str]) -> list[str]:
+    """Slugify a submitted tag list, dropping repeats but keeping order."""
+    return list(dict.fromkeys(slugify(tag) for tag in tag_list))
+
+
+async def link_tags(session: AsyncSession, slug: str, names: Sequence[str]):
+    """
+    Attach tags to an article.
+
+    Missing `Tag` rows are created and the links inserted with one
+    statement each, whatever the number of tags. `names` must not already
+    be linked to the article.
+    """
+    await link_many_tags(session, {slug: names})
+
+
+async def link_many_tags(
+    session: AsyncSession, tags: Mapping[str, Sequence[str]]
+):
+    """Attach tags to several articles at once, keyed by article slug."""
+    links = [
+        {'article_slug': slug, 'tag_name': name}
+        for slug, names in tags.items()
+        for name in names
+    ]
+    if not links:
+        return
+
+    names = list(dict.fromkeys(link['tag_name'] for link in links))
+    await session.execute(
+        insert(Tag)
+        .values([{'name': name} for name in names])
+        .on_conflict_do_nothing(index_elements=[Tag.name])
+    )
+    await session.execute(insert(TagArticle), links)
+    await count_tags(session, added=[link['tag_name'] for link in links])
+
+
+async def unlink_tags(session: AsyncSession, slug: str, names: Sequence[str]):
+    """Detach tags from an article with a single delete."""
+    if not names:
+        return
+
+    await session.execute(
+        delete(TagArticle).where(
+            TagArticle.article_slug == slug, TagArticle.tag_name.in_(names)
+        )
+    )
+    await count_tags(session, removed=names)
+
+
+async def count_tags(
+    session: AsyncSession,
+    added: Iterable[str] = (),
+    removed: Iterable[str] = (),
+):
+    """
+    Apply tag links being created or dropped to tag_stats.
+
+    Each occurrence of a name in `added` or `removed` is one article
+    gaining or losing that tag; either may also map names to counts.
+    """
+    added = Counter(added)
+    removed = Counter(removed)
+
+    if added:
+        stmt = insert(TagStats).values(
+            [
+                {'name': name, 'articles_count': count}
+                for name, count in added.items()
+            ]
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[TagStats.name],
+                set_={
+                    'articles_count': TagStats.articles_count
+                    + stmt.excluded.articles_count
+                },
+            )
+        )
+
+    if removed:
+        await session.execute(
+            update(TagStats)
+            .where(TagStats.name.in_(removed))
+            .values(
+                articles_count=TagStats.articles_count
+                - case(removed, value=TagStats.name)
+            )
+        )
+        await session.execute(
+            delete(TagStats).where(
+                TagStats.name.in_(removed), TagStats.articles_count <= 0
+            )
+        )
@@ -0,0 +1,180 @@
+from typing import Optional, Sequence
+
+from sqlalchemy import delete, literal, select, union
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.models import Article, Follow, Timeline, User
+from api.db.pagination import page, seek
+from api.settings import get_settings
+
+settings = get_settings()
+
+
+def is_fanned_out(author: User) -> bool:
+    return author.followers_count <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+async def fan_out(session: AsyncSession, author_id: int, slugs: Sequence[str]):
+    """Push new articles into the timelines of their author's followers."""
+    followers_count = (
+        select(User.followers_count)
+        .where(User.id == author_id)
+        .scalar_subquery()
+    )
+
+    await session.execute(
+        insert(Timeline).from_select(
+            ['user_id', 'article_id', 'created_at'],
+            select(Follow.user_id, Article.id, Article.created_at)
+            .join(Article, Article.user_id == Follow.following_id)
+            .where(
+                Follow.following_id == author_id,
+                Article.slug.in_(slugs),
+                followers_count <= settings.FEED_FANOUT_MAX_FOLLOWERS,
+            ),
+        )
+    )
+
+
+async def backfill(session: AsyncSession, user_id: int, author: User):
+    """Copy the articles of a newly followed author into a timeline."""
+    if not is_fanned_out(author):
+        return
+
+    await session.execute(
+        insert(Timeline).from_select(
+            ['user_id', 'article_id', 'created_at'],
+            select(literal(user_id), Article.id, Article.created_at).where(
+                Article.user_id == author.id
+            ),
+        )
+    )
+
+
+async def prune(session: AsyncSession, user_id: int, author_id: int):
+    """Drop an unfollowed author's articles from a timeline."""
+    await session.execute(
+        delete(Timeline).where(
+            Timeline.user_id == user_id,
+            Timeline.article_id.in_(
+                select(Article.id).where(Article.user_id == author_id)
+            ),
+        )
+    )
+
+
+async def catch_up(session: AsyncSession, author_ids):
+    """
+    Fan out again the authors, by ids or a query of them, that a lost
+    follower has just brought back down to FEED_FANOUT_MAX_FOLLOWERS.
+
+    What they wrote while over it was pulled at read time and is in no
+    timeline, so every article of theirs is copied into their remaining
+    followers' timelines. Call after decrementing `followers_count`.
+    """
+    await session.execute(
+        insert(Timeline)
+        .from_select(
+            ['user_id', 'article_id', 'created_at'],
+            select(Follow.user_id, Article.id, Article.created_at)
+            .join(Article, Article.user_id == Follow.following_id)
+            .join(User, User.id == Follow.following_id)
+            .where(
+                Follow.following_id.in_(author_ids),
+                User.followers_count == settings.FEED_FANOUT_MAX_FOLLOWERS,
+            ),
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+async def retract(session: AsyncSession, article_ids):
+    """Drop deleted articles, by ids or a query of them, from timelines."""
+    await session.execute(
+        delete(Timeline).where(Timeline.article_id.in_(article_ids)),
+        execution_options={'synchronize_session': False},
+    )
+
+
+async def rebuild(session: AsyncSession):
+    """Recreate every timeline from the current follows."""
+    await session.execute(delete(Timeline))
+    await session.execute(
+        insert(Timeline).from_select(
+            ['user_id', 'article_id', 'created_at'],
+            select(Follow.user_id, Article.id, Article.created_at)
+            .join(Article, Article.user_id == Follow.following_id)
+            .join(User, User.id == Follow.following_id)
+            .where(User.followers_count <= settings.FEED_FANOUT_MAX_FOLLOWERS),
+        )
+    )
+
+
+async def read_feed(
+    session: AsyncSession,
+    user_id: int,
+    cursor: Optional[str],
+    limit: int,
+    offset: int = 0,
+) -> tuple[list[Article], Optional[str]]:
+    """
+    Read a page of a user's feed.
+
+    Usually a single range scan over the user's timeline. Articles from
+    followed authors that are too popular to be fanned out are merged in
+    from `articles` at read time.
+    """
+    pulled_authors = (
+        await session.scalars(
+            select(User.id)
+            .join(Follow, Follow.following_id == User.id)
+            .where(
+                Follow.user_id == user_id,
+                User.followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS,
+            )
+        )
+    ).all()
+
+    if not pulled_authors:
+        query = (
+            select(Article)
+            .join(Timeline, Timeline.article_id == Article.id)
+            .where(Timeline.user_id == user_id)
+        )
+        result = await session.execute(
+            seek(
+                query,
+                Timeline.created_at,
+                Timeline.article_id,
+                cursor,
+                limit,
+                offset,
+            )
+        )
+
+        return page(result.all(), limit)
+
+    entries = union(
+        select(
+            Timeline.article_id.label('article_id'),
+            Timeline.created_at.label('created_at'),
+        ).where(Timeline.user_id == user_id),
+        select(Article.id, Article.created_at).where(
+            Article.user_id.in_(pulled_authors)
+        ),
+    ).subquery()
+
+    query = select(Article).join(entries, entries.c.article_id == Article.id)
+    result = await session.execute(
+        seek(
+            query,
+            entries.c.created_at,
+            entries.c.article_id,
+            cursor,
+            limit,
+            offset,
+        )
+    )
+
+    return page(result.all(), limit)
@@ -0,0 +1,135 @@
+from datetime import datetime
+
+from sqlalchemy import Select, delete, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.export import export_query
+from api.db.models import (
+    Article,
+    Comment,
+    Favorites,
+    Follow,
+    PostComment,
+    TagArticle,
+    TagStats,
+    Timeline,
+    User,
+)
+from api.db.pagination import encode_cursor, seek
+from api.db.search import search_query
+from api.routes.article import filter_articles
+
+CURSOR = encode_cursor('2024-01-01 00:00:00', 1)
+SLUGS = ['how-to-train-your-dragon', 'how-to-train-your-dragon-2']
+IDS = [1, 2]
+
+
+def route_queries() -> dict[str, Select]:
+    """The lookups the routes run, with placeholder values."""
+    return {
+        'list articles': seek(
+            select(Article), Article.created_at, Article.id, None, 20
+        ),
+        'list articles after cursor': seek(
+            select(Article), Article.created_at, Article.id, CURSOR, 20
+        ),
+        'list articles by tag': seek(
+            filter_articles(select(Article), tag='dragons'),
+            Article.created_at,
+            Article.id,
+            None,
+            20,
+        ),
+        'list articles by author': seek(
+            filter_articles(select(Article), author='jake'),
+            Article.created_at,
+            Article.id,
+            CURSOR,
+            20,
+        ),
+        'list articles favorited by': seek(
+            filter_articles(select(Article), favorited='jake'),
+            Article.created_at,
+            Article.id,
+            None,
+            20,
+        ),
+        'feed': seek(
+            select(Article)
+            .join(Timeline, Timeline.article_id == Article.id)
+            .where(Timeline.user_id == 1),
+            Timeline.created_at,
+            Timeline.article_id,
+            CURSOR,
+            20,
+        ),
+        'feed pulled authors': select(User.id)
+        .join(Follow, Follow.following_id == User.id)
+        .where(Follow.user_id == 1),
+        'search': search_query('"dragons"', None, 20),
+        'search after cursor': search_query(
+            '"dragons"', encode_cursor(-1.5, 1), 20
+        ),
+        'article by slug': select(Article).where(Article.slug == SLUGS[0]),
+        'page tags': select(
+            TagArticle.article_slug, TagArticle.tag_name
+        ).where(TagArticle.article_slug.in_(SLUGS)),
+        'page authors': select(User).where(User.id.in_(IDS)),
+        'page follows': select(Follow.following_id).where(
+            Follow.user_id == 1, Follow.following_id.in_(IDS)
+        ),
+        'page favorites': select(Favorites.article_id).where(
+            Favorites.favorited_by_user == 'jake',
+            Favorites.article_id.in_(IDS),
+        ),
+        'login': select(User).where(User.email == 'jake@jake.jake'),
+        'register': select(User).where(
+            (User.username == 'jake') | (User.email == 'jake@jake.jake')
+        ),
+        'profile': select(User).where(User.username == 'jake'),
+        'comments of article': seek(
+            select(Comment, User)
+            .join(PostComment, PostComment.comment_id == Comment.id)
+            .join(User, User.id == Comment.user_id)
+            .where(PostComment.article_slug == SLUGS[0]),
+            Comment.created_at,
+            Comment.id,
+            encode_cursor('2024-01-01 00:00:00', 1),
+            20,
+        ),
+        'comment link': select(PostComment).where(PostComment.comment_id == 1),
+        'comments of user': select(Comment).where(Comment.user_id == 1),
+        'tags of user': select(TagArticle.tag_name)
+        .join(Article, Article.slug == TagArticle.article_slug)
+        .where(Article.user_id == 1),
+        'popular tags': select(TagStats.name)
+        .order_by(TagStats.articles_count.desc(), TagStats.name)
+        .limit(20),
+        'retract from timelines': delete(Timeline).where(
+            Timeline.article_id == 1
+        ),
+        'export changes since': export_query(datetime(2024, 1, 1)),
+    }
+
+
+async def query_plan(session: AsyncSession, statement) -> list[str]:
+    """Ask SQLite how it would run `statement`."""
+    sql = statement.compile(
+        dialect=sqlite.dialect(),
+        compile_kwargs={'literal_binds': True, 'render_postcompile': True},
+    )
+    result = await session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))
+
+    return [row[-1] for row in result]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Steps reading a whole table instead of searching an index."""
+    return [
+        step
+        for step in plan
+        if step.startswith('SCAN')
+        and ' USING ' not in step
+        and ' VIRTUAL TABLE ' not in step
+    ]
@@ -0,0 +1,187 @@
+import json
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from api.settings import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger('api.sql')
+
+# Placeholder lists of expanded IN clauses and VALUES rows vary with the
+# number of items; they are collapsed so every size has the same shape.
+PLACEHOLDER_LIST = re.compile(r'\((?:\?|%s|:\w+)(?:, (?:\?|%s|:\w+))+\)')
+WHITESPACE = re.compile(r'\s+')
+MAX_PARAMETERS_LENGTH = 500
+
+
+def normalize(statement: str) -> str:
+    """The shape of a statement, the same whatever the number of items."""
+    return PLACEHOLDER_LIST.sub(
+        '(...)', WHITESPACE.sub(' ', statement)
+    ).strip()
+
+
+class QueryStats:
+    """Statements one request ran and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds_total = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes: Counter = Counter()
+        # Lookups the request's Loader answered without a query of their
+        # own, from its cache or batched with others.
+        self.saved = 0
+
+    def observe(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds_total += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        if settings.SQL_DEBUG:
+            self.shapes[statement] += 1
+
+    def repeated(self) -> dict[str, int]:
+        """Shapes run often enough to suggest an N+1 query pattern."""
+        return {
+            statement: count
+            for statement, count in self.shapes.items()
+            if count >= settings.SQL_REPEATED_STATEMENT_THRESHOLD
+        }
+
+    def server_timing(self, app_seconds: float) -> str:
+        return (
+            f'db;desc="{self.count} queries";'
+            f'dur={self.seconds_total * 1000:.2f}, '
+            f'db-slowest;dur={self.slowest_seconds * 1000:.2f}, '
+            f'app;dur={app_seconds * 1000:.2f}'
+        )
+
+
+# Set to a fresh QueryStats for each request by QueryStatsMiddleware. The
+# object itself is shared, so statements run in tasks, threads and
+# greenlets copying the request's context are counted too.
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    'query_stats', default=None
+)
+
+
+def before_cursor_execute(
+    connection, cursor, statement, parameters, context, executemany
+):
+    context.query_started = perf_counter()
+
+
+def after_cursor_execute(
+    connection, cursor, statement, parameters, context, executemany
+):
+    seconds = perf_counter() - context.query_started
+    shape = normalize(statement)
+
+    stats = query_stats.get()
+    if stats is not None:
+        stats.observe(shape, seconds)
+
+    threshold = settings.SQL_SLOW_QUERY_SECONDS
+    if threshold is not None and seconds >= threshold:
+        logger.warning(
+            json.dumps(
+                {
+                    'event': 'slow_query',
+                    'seconds': round(seconds, 6),
+                    'statement': shape,
+                    'parameters': repr(parameters)[:MAX_PARAMETERS_LENGTH],
+                    'executemany': executemany,
+                }
+            )
+        )
+
+
+def instrument(sync_engine: Engine):
+    """Time every statement `sync_engine` runs."""
+    event.listen(sync_engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """
+    Count the statements of each request and the time spent in them.
+
+    The totals are sent in a Server-Timing header and logged as one JSON
+    line per request on the `api.sql` logger, with the round-trips the
+    request's Loader saved. With SQL_DEBUG, statements
+    of the same shape repeated within a request are logged as a warning,
+    as they usually come from a query run once per row.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        started = perf_counter()
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                timing = stats.server_timing(perf_counter() - started)
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'server-timing', timing.encode('latin-1')),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.reset(token)
+            self.log(scope, status, stats, perf_counter() - started)
+
+    def log(self, scope, status, stats: QueryStats, seconds: float):
+        if logger.isEnabledFor(logging.INFO):
+            self.log_request(scope, status, stats, seconds)
+
+        repeated = stats.repeated()
+        if repeated:
+            logger.warning(
+                json.dumps(
+                    {
+                        'event': 'repeated_statements',
+                        'method': scope['method'],
+                        'path': scope['path'],
+                        'statements': repeated,
+                    }
+                )
+            )
+
+    def log_request(self, scope, status, stats: QueryStats, seconds: float):
+        record = {
+            'event': 'request',
+            'method': scope['method'],
+            'path': scope['path'],
+            'status': status,
+            'seconds': round(seconds, 6),
+            'queries': stats.count,
+            'queries_saved': stats.saved,
+            'db_seconds': round(stats.seconds_total, 6),
+            'slowest_seconds': round(stats.slowest_seconds, 6),
+            'slowest_statement': stats.slowest_statement,
+        }
+        logger.info(json.dumps(record))
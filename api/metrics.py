@@ -0,0 +1,200 @@
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Optional
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+class LatencyStats:
+    """Running count, total and maximum of observed durations."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+
+    @contextmanager
+    def time(self):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            'count': self.count,
+            'seconds_total': self.seconds_total,
+            'seconds_max': self.seconds_max,
+            'seconds_mean': (
+                self.seconds_total / self.count if self.count else 0.0
+            ),
+        }
+
+
+# Request latency and in-flight requests are recorded as they happen; the
+# state of the pool, caches and password hasher is copied into gauges by
+# `record_state`. With PROMETHEUS_MULTIPROC_DIR set, every worker writes
+# its values under that directory and /metrics aggregates them all; gauges
+# are summed over live processes unless noted.
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Time to serve a request, by route template and status.',
+    ['method', 'route', 'status'],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Requests being served.',
+    ['method'],
+    multiprocess_mode='livesum',
+)
+POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'Connections of the database pool, by state.',
+    ['state'],
+    multiprocess_mode='livesum',
+)
+POOL_CHECKOUTS = Gauge(
+    'db_pool_checkouts',
+    'Connections checked out of the pool since the process started.',
+    multiprocess_mode='livesum',
+)
+POOL_WAIT_SECONDS = Gauge(
+    'db_pool_wait_seconds',
+    'Time spent waiting for a connection since the process started.',
+    multiprocess_mode='livesum',
+)
+CACHE_LOOKUPS = Gauge(
+    'cache_lookups',
+    'Cache lookups since the process started, by cache and result.',
+    ['cache', 'result'],
+    multiprocess_mode='livesum',
+)
+CACHE_HIT_RATIO = Gauge(
+    'cache_hit_ratio',
+    'Share of lookups served from the cache, per process.',
+    ['cache'],
+    multiprocess_mode='liveall',
+)
+HASHER_QUEUE_DEPTH = Gauge(
+    'password_hash_queue_depth',
+    'Password hashing jobs submitted and not finished.',
+    multiprocess_mode='livesum',
+)
+HASHER_QUEUE_DEPTH_MAX = Gauge(
+    'password_hash_queue_depth_max',
+    'Deepest the password hashing queue has been, in any process.',
+    multiprocess_mode='livemax',
+)
+
+
+def is_multiprocess() -> bool:
+    return 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+
+def record_state(pool: dict, caches: dict[str, dict], hasher: dict):
+    """Copy the stats of the pool, caches and hasher into their gauges."""
+    if pool:
+        POOL_CONNECTIONS.labels('size').set(pool['size'])
+        POOL_CONNECTIONS.labels('checked_out').set(pool['checked_out'])
+        # QueuePool reports unused base connections as negative overflow.
+        POOL_CONNECTIONS.labels('overflow').set(max(pool['overflow'], 0))
+        POOL_CHECKOUTS.set(pool['checkouts'])
+        POOL_WAIT_SECONDS.set(pool['wait_seconds_total'])
+
+    for name, stats in caches.items():
+        CACHE_LOOKUPS.labels(name, 'hit').set(stats['hits'])
+        CACHE_LOOKUPS.labels(name, 'miss').set(stats['misses'])
+        CACHE_HIT_RATIO.labels(name).set(stats['hit_ratio'])
+
+    HASHER_QUEUE_DEPTH.set(hasher['queue_depth'])
+    HASHER_QUEUE_DEPTH_MAX.set(hasher['queue_depth_max'])
+
+
+def exposition() -> bytes:
+    """Every metric in the Prometheus text format."""
+    registry = REGISTRY
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    return generate_latest(registry)
+
+
+def mark_process_dead():
+    """Drop the live gauges of this process from the aggregation."""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Time every request into REQUEST_LATENCY and count those in flight.
+
+    Requests are labelled with the template of the route they matched,
+    not their path, so the number of series stays bounded. Labelled
+    children are looked up once and kept, so recording a request is a
+    dict lookup and two updates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.routes: Optional[dict] = None
+        self.latency: dict[tuple, Any] = {}
+        self.in_flight: dict[str, Any] = {}
+
+    def route(self, scope) -> str:
+        if self.routes is None:
+            self.routes = {
+                route.endpoint: route.path
+                for route in scope['app'].routes
+                if hasattr(route, 'endpoint')
+            }
+
+        return self.routes.get(scope.get('endpoint'), 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        in_flight = self.in_flight.get(method)
+        if in_flight is None:
+            in_flight = self.in_flight[method] = REQUESTS_IN_FLIGHT.labels(
+                method
+            )
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        in_flight.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = perf_counter() - started
+            in_flight.dec()
+
+            key = (method, self.route(scope), status)
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = REQUEST_LATENCY.labels(*key)
+            latency.observe(seconds)
@@ -0,0 +1,58 @@
+from typing import Iterable, Optional, Sequence
+from urllib.parse import urlencode
+
+from api.cache import MemoryResponseCache, ResponseCache
+from api.db.models import Article
+from api.settings import get_settings
+
+settings = get_settings()
+
+# Replace with another ResponseCache, e.g. one over a store shared by
+# every worker, to cache across processes.
+article_list_cache: ResponseCache = MemoryResponseCache(
+    maxbytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+
+
+def list_key(**params) -> str:
+    """Cache key of a list page, the same however the query was spelled."""
+    return 'articles?' + urlencode(
+        sorted(
+            (name, value)
+            for name, value in params.items()
+            if value not in (None, '', 0)
+        )
+    )
+
+
+def list_tags(
+    tag: Optional[str],
+    author: Optional[str],
+    favorited: Optional[str],
+    articles: Sequence[Article],
+) -> list[str]:
+    """
+    Tags of a list page.
+
+    The filters name which writes can change what the page selects, the
+    articles and authors shown name which can change how it renders.
+    """
+    tags = [
+        f'{name}:{value}'
+        for name, value in (
+            ('tag', tag),
+            ('author', author),
+            ('favorited', favorited),
+        )
+        if value
+    ] or ['all']
+
+    tags += [f'article:{article.id}' for article in articles]
+    tags += {f'user:{article.user_id}' for article in articles}
+
+    return tags
+
+
+async def invalidate_articles(tags: Iterable[str]):
+    await article_list_cache.invalidate(tags)
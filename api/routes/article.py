@@ -1,45 +1,84 @@
+from datetime import datetime
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from slugify import slugify
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
-
+from sqlalchemy import Select, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.conditional import (
+    cache_control,
+    cache_control_headers,
+    cache_headers,
+    entity_tag,
+    is_not_modified,
+    not_modified,
+)
+from api.db.bulk import import_articles, ndjson_lines
 from api.db.database import get_session
+from api.db.export import export_articles, gzipped
+from api.db.hydration import hydrate_articles
+from api.db.loader import Loader, get_loader, get_read_loader
 from api.db.models import (
     Article,
-    Comment,
     Favorites,
-    Follow,
     PostComment,
     TagArticle,
     User,
+    utcnow,
 )
+from api.db.pagination import MAX_LIMIT, MAX_OFFSET, page, seek
+from api.db.purge import delete_articles
+from api.db.replicas import get_read_session
 from api.db.schemas import (
     ArticleInput,
     ArticleUpdate,
+    BulkImportResult,
     Message,
     MultArticle,
-    Profile,
     PublicArticleSchema,
+    SearchArticle,
+    SearchResults,
 )
-from api.routes.profile import get_profile
+from api.db.search import search_articles
+from api.db.tags import link_tags, tag_names, unlink_tags
+from api.db.timeline import fan_out, read_feed
+from api.response_cache import (
+    article_list_cache,
+    invalidate_articles,
+    list_key,
+    list_tags,
+)
+from api.routes.profile import load_profile
 from api.routes.user import CurrentUser
-from api.security import get_current_user_optional
+from api.security import Principal, get_current_user_optional
+from api.serialization import build, dump_json, render
+from api.settings import get_settings
 
 router = APIRouter(prefix='/api/articles', tags=['Articles'])
-Session = Annotated[Session, Depends(get_session)]
+Session = Annotated[AsyncSession, Depends(get_session)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+RequestLoader = Annotated[Loader, Depends(get_loader)]
+ReadLoader = Annotated[Loader, Depends(get_read_loader)]
+settings = get_settings()
+
+MAX_BULK_BATCH_SIZE = 5_000
+MAX_EXPORT_CHUNK_SIZE = 10_000
 
 
 @router.post('/', status_code=201)
-def create_article(
+async def create_article(
     article: ArticleInput,
     current_user: CurrentUser,
     session: Session,
+    loader: RequestLoader,
 ):
     slug = slugify(article.title)
 
-    article_name = session.scalar(select(Article).where(Article.slug == slug))
+    article_name = await session.scalar(
+        select(Article).where(Article.slug == slug)
+    )
     if article_name:
         raise HTTPException(
             status_code=400, detail='Article title already used'
@@ -52,49 +91,31 @@ def create_article(
         body=article.body,
         created_at=func.now(),
         updated_at=func.now(),
-        author=current_user,
+        user_id=current_user.id,
     )
 
-    if article.tag_list is not None:
-        for tag in article.tag_list:
-            tags_to_link = session.scalar(
-                select(TagArticle).where(
-                    TagArticle.tag_name == tag, TagArticle.article_slug == slug
-                )
-            )
-            if tags_to_link:
-                raise HTTPException(
-                    status_code=400, detail=f"Tag '{tag}' is duplicated"
-                )
-
-            tag_slug = slugify(tag)
-
-            tag_article = TagArticle(article_slug=slug, tag_name=tag_slug)
-
-            session.add(tag_article)
-            session.commit()
-
-    tags = session.scalars(
-        select(TagArticle).where(TagArticle.article_slug == slug)
-    ).all()
-
-    db_article.tag_list = tags
-
     session.add(db_article)
-    session.commit()
+    await session.flush()
+
+    tags = tag_names(article.tag_list or [])
+    await link_tags(session, slug, tags)
 
-    author_profile = get_profile(
-        username=db_article.author.username,
-        session=session,
-        current_user=current_user,
+    await fan_out(session, current_user.id, [slug])
+    await session.commit()
+    await invalidate_articles(
+        ['all', f'author:{current_user.username}']
+        + [f'tag:{tag}' for tag in tags]
     )
+    await session.refresh(db_article)
+
+    author_profile = await load_profile(loader, current_user, current_user)
 
     article_response: PublicArticleSchema = PublicArticleSchema(
         slug=db_article.slug,
         title=db_article.title,
         description=db_article.description,
         body=db_article.body,
-        tag_list=article.tag_list,
+        tag_list=tags,
         created_at=db_article.created_at,
         updated_at=db_article.updated_at,
         author=author_profile,
@@ -105,207 +126,323 @@ def create_article(
     return article_response
 
 
-@router.get('/', response_model=MultArticle, status_code=200)
-def get_articles(
+@router.post('/bulk', response_model=BulkImportResult, status_code=200)
+async def bulk_import_articles(
+    request: Request,
+    current_user: CurrentUser,
     session: Session,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    tag: str = Query(None),
-    author: str = Query(None),
-    favorited: str = Query(None),
-    offset: Optional[int] = 0,
-    limit: Optional[int] = 20,
+    batch_size: int = Query(
+        settings.BULK_IMPORT_BATCH_SIZE, ge=1, le=MAX_BULK_BATCH_SIZE
+    ),
 ):
-    query = select(Article)
+    """
+    Create articles from an NDJSON body, one `ArticleInput` per line.
+
+    The body is read as it streams in and committed `batch_size` articles
+    at a time; lines that fail are listed by number in the response
+    while the rest are imported.
+    """
+    return await import_articles(
+        session,
+        current_user,
+        ndjson_lines(request.stream(), settings.BULK_IMPORT_MAX_LINE_BYTES),
+        batch_size,
+    )
+
+
+def filter_articles(
+    query: Select,
+    tag: Optional[str] = None,
+    author: Optional[str] = None,
+    favorited: Optional[str] = None,
+) -> Select:
+    """
+    Narrow an article query the way the list route's parameters ask for.
 
+    Each filter is a lookup on the indexed side rather than a correlated
+    EXISTS, which SQLite can only check row by row.
+    """
     if tag:
-        query = select(Article).where(Article.tag_list.any(tag_name=tag))
+        query = query.where(
+            Article.slug.in_(
+                select(TagArticle.article_slug).where(
+                    TagArticle.tag_name == tag
+                )
+            )
+        )
 
     if author:
-        query = select(Article).where(Article.author.has(username=author))
+        query = query.where(
+            Article.user_id
+            == select(User.id).where(User.username == author).scalar_subquery()
+        )
 
     if favorited:
-        query = select(Article).where(
-            Article.favorited.any(favorited_by_user=favorited)
+        query = query.where(
+            Article.id.in_(
+                select(Favorites.article_id).where(
+                    Favorites.favorited_by_user == favorited
+                )
+            )
         )
 
-    articles = session.scalars(
-        query.order_by(Article.created_at.desc()).offset(offset).limit(limit)
-    ).all()
-    articles_list = []
+    return query
 
-    for article in articles:
-        tags = []
-        author_name = article.author
-        tag_list = article.tag_list
 
-        for tag in tag_list:
-            tags.append(tag.tag_name)
+@router.get(
+    '/',
+    response_model=MultArticle,
+    status_code=200,
+    dependencies=[Depends(cache_control('get_articles'))],
+)
+async def get_articles(
+    loader: ReadLoader,
+    primary: RequestLoader,
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
+    tag: str = Query(None),
+    author: str = Query(None),
+    favorited: str = Query(None),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0, le=MAX_OFFSET),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+):
+    # Anonymous pages look the same to everyone, so they are served from
+    # the response cache. They are read from the primary when missing, as
+    # a page read from a lagging replica would stay cached past the
+    # invalidation of the writes it misses.
+    if current_user is None:
+        loader = primary
+        key = list_key(
+            tag=tag,
+            author=author,
+            favorited=favorited,
+            cursor=cursor,
+            offset=offset,
+            limit=limit,
+        )
+        cached = await article_list_cache.get(key)
+        if cached is not None:
+            return cached_response(cached, 'HIT')
 
-        following = False
-        favorited_article = False
+        generation = await article_list_cache.generation()
 
-        article_favorite = session.scalars(
-            select(Favorites).where(Favorites.article_id == article.id)
-        ).all()
+    query = filter_articles(select(Article), tag, author, favorited)
 
-        if current_user:
-            checking_following_author = session.scalar(
-                select(Follow).where(
-                    Follow.following_id == article.user_id,
-                    Follow.user_id == current_user.id,
-                )
-            )
-            article_to_favorite = session.scalar(
-                select(Favorites).where(
-                    Favorites.favorited_by_user == current_user.username,
-                    Favorites.article_id == article.id,
-                )
-            )
+    result = await loader.session.execute(
+        seek(query, Article.created_at, Article.id, cursor, limit, offset)
+    )
+    articles, next_cursor = page(result.all(), limit)
+    articles_list = await hydrate_articles(loader, articles, current_user)
 
-            if checking_following_author:
-                following = True
+    articles_count = articles_list.__len__()
 
-            if article_to_favorite:
-                favorited_article = True
+    response = build(
+        MultArticle,
+        articles=articles_list,
+        articles_count=articles_count,
+        next_cursor=next_cursor,
+    )
 
-        profile = Profile(
-            username=author_name.username,
-            bio=author_name.bio,
-            image=author_name.image,
-            email=author_name.email,
-            following=following,
-        )
-        article_response: PublicArticleSchema = PublicArticleSchema(
-            slug=article.slug,
-            title=article.title,
-            description=article.description,
-            body=article.body,
-            tag_list=tags,
-            created_at=article.created_at,
-            updated_at=article.updated_at,
-            favorited=favorited_article,
-            favorites_count=article_favorite.__len__(),
-            author=profile,
+    if current_user is None:
+        body = dump_json(response)
+        await article_list_cache.set(
+            key,
+            body,
+            list_tags(tag, author, favorited, articles),
+            generation,
         )
+        return cached_response(body, 'MISS')
 
-        articles_list.append(article_response)
+    return render(response, headers=cache_control_headers('get_articles'))
 
-    articles_count = articles_list.__len__()
 
-    return {'articles': articles_list, 'articles_count': articles_count}
+def cached_response(body: bytes, status: str) -> Response:
+    return Response(
+        body,
+        media_type='application/json',
+        headers={'X-Cache': status, **cache_control_headers('get_articles')},
+    )
 
 
 @router.get('/feed', response_model=MultArticle, status_code=200)
-def get_feed(session: Session, current_user: CurrentUser):
-    feed = session.scalars(
-        select(Article)
-        .where(
-            Article.user_id == Follow.following_id,
-            Follow.user_id == current_user.id,
-        )
-        .order_by(Article.created_at.desc())
-    ).all()
-
-    articles_list = []
+async def get_feed(
+    session: ReadSession,
+    loader: ReadLoader,
+    current_user: CurrentUser,
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0, le=MAX_OFFSET),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+):
+    feed, next_cursor = await read_feed(
+        session, current_user.id, cursor, limit, offset
+    )
+    articles_list = await hydrate_articles(loader, feed, current_user)
 
-    for article in feed:
-        tags = []
-        author_name = article.author
-        tag_list = article.tag_list
+    articles_count = articles_list.__len__()
 
-        for tag in tag_list:
-            tags.append(tag.tag_name)
+    return render(
+        build(
+            MultArticle,
+            articles=articles_list,
+            articles_count=articles_count,
+            next_cursor=next_cursor,
+        )
+    )
 
-        favorited = False
 
-        article_favorite = session.scalars(
-            select(Favorites).where(Favorites.article_id == article.id)
-        ).all()
+# Declared before '/{slug}', which would otherwise match 'search'.
+@router.get(
+    '/search',
+    response_model=SearchResults,
+    status_code=200,
+    dependencies=[Depends(cache_control('search'))],
+)
+async def search(
+    session: ReadSession,
+    loader: ReadLoader,
+    q: str = Query(min_length=1, max_length=200),
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+):
+    hits, next_cursor = await search_articles(session, q, cursor, limit)
+    articles_list = await hydrate_articles(
+        loader, [article for article, _ in hits], current_user
+    )
 
-        check_user_favorite = session.scalar(
-            select(Favorites).where(
-                Favorites.favorited_by_user == current_user.username,
-                Favorites.article_id == article.id,
-            )
-        )
+    return render(
+        build(
+            SearchResults,
+            articles=[
+                build(SearchArticle, **dict(article), snippet=snippet)
+                for article, (_, snippet) in zip(articles_list, hits)
+            ],
+            articles_count=len(articles_list),
+            next_cursor=next_cursor,
+        ),
+        headers=cache_control_headers('search'),
+    )
 
-        if check_user_favorite:
-            favorited = True
 
-        profile = Profile(
-            username=author_name.username,
-            bio=author_name.bio,
-            image=author_name.image,
-            email=author_name.email,
-            following=True,
-        )
-        article_response: PublicArticleSchema = PublicArticleSchema(
-            slug=article.slug,
-            title=article.title,
-            description=article.description,
-            body=article.body,
-            tag_list=tags,
-            created_at=article.created_at,
-            updated_at=article.updated_at,
-            favorited=favorited,
-            favorites_count=article_favorite.__len__(),
-            author=profile,
+# Declared before '/{slug}', which would otherwise match 'export'.
+@router.get('/export', status_code=200)
+async def export(
+    current_user: CurrentUser,
+    session: ReadSession,
+    updated_since: Optional[datetime] = None,
+    gzip: bool = False,
+    chunk_size: int = Query(
+        settings.EXPORT_CHUNK_SIZE, ge=1, le=MAX_EXPORT_CHUNK_SIZE
+    ),
+):
+    """
+    Stream every article as NDJSON, with its tags, author and counters.
+
+    With `updated_since`, only articles changed at or after that time are
+    sent. X-Export-Started-At tells when the export began, to pass as
+    `updated_since` for the next delta.
+    """
+    headers = {'X-Export-Started-At': utcnow().isoformat()}
+    chunks = export_articles(session, updated_since, chunk_size)
+
+    if gzip:
+        headers[
+            'Content-Disposition'
+        ] = 'attachment; filename="articles.ndjson.gz"'
+        return StreamingResponse(
+            gzipped(chunks), media_type='application/gzip', headers=headers
         )
 
-        articles_list.append(article_response)
+    return StreamingResponse(
+        chunks, media_type='application/x-ndjson', headers=headers
+    )
 
-    articles_count = articles_list.__len__()
 
-    return {'articles': articles_list, 'articles_count': articles_count}
+async def load_article(
+    loader: Loader, slug: str
+) -> Optional[PublicArticleSchema]:
+    article = await loader.session.scalar(
+        select(Article).where(Article.slug == slug)
+    )
+    if article is None:
+        return None
 
+    return (await hydrate_articles(loader, [article]))[0]
 
-@router.get('/{slug}', status_code=200)
-def get_article(slug: str, session: Session):
-    article_user = session.scalar(select(Article).where(Article.slug == slug))
 
-    following = False
+@router.get('/{slug}', response_model=PublicArticleSchema, status_code=200)
+async def get_article(
+    slug: str,
+    request: Request,
+    response: Response,
+    session: ReadSession,
+    loader: ReadLoader,
+):
+    # The response does not depend on the viewer, so the validators only
+    # need the article row and what is shown of its author. The author is
+    # kept by the loader for building the response.
+    version = (
+        await session.execute(
+            select(
+                Article.updated_at,
+                Article.favorites_count,
+                Article.comments_count,
+                User,
+            )
+            .join(User, User.id == Article.user_id)
+            .where(Article.slug == slug)
+        )
+    ).first()
+    if version is None:
+        raise HTTPException(status_code=404, detail='Article not found')
 
-    article_favorite = session.scalars(
-        select(Favorites).where(Favorites.article_id == article_user.id)
-    ).all()
+    updated_at, favorites_count, comments_count, author = version
+    loader.prime(author)
+    etag = entity_tag(
+        updated_at,
+        favorites_count,
+        comments_count,
+        author.username,
+        author.bio,
+        author.image,
+        author.email,
+    )
+    headers = cache_headers('get_article', etag, updated_at)
+    if is_not_modified(request, headers['ETag'], updated_at):
+        return not_modified(headers)
 
-    tags = []
-    for tag in article_user.tag_list:
-        tags.append(tag.tag_name)
+    article = await load_article(loader, slug)
+    if article is None:
+        raise HTTPException(status_code=404, detail='Article not found')
 
-    profile = Profile(
-        username=article_user.author.username,
-        bio=article_user.author.bio,
-        image=article_user.author.image,
-        email=article_user.author.email,
-        following=following,
-    )
-    article_response: PublicArticleSchema = PublicArticleSchema(
-        slug=article_user.slug,
-        title=article_user.title,
-        description=article_user.description,
-        body=article_user.body,
-        tag_list=tags,
-        created_at=article_user.created_at,
-        updated_at=article_user.updated_at,
-        author=profile,
-        favorites_count=article_favorite.__len__(),
-        favorited=False,
+    # Tagged from what is actually sent, in case it changed in between.
+    author = article.author
+    etag = entity_tag(
+        article.updated_at,
+        article.favorites_count,
+        article.comments_count,
+        author.username,
+        author.bio,
+        author.image,
+        author.email,
     )
+    headers = cache_headers('get_article', etag, article.updated_at)
+    response.headers.update(headers)
 
-    return article_response
+    return render(article, headers=headers)
 
 
 @router.patch(
     '/{article_slug}', response_model=PublicArticleSchema, status_code=200
 )
-def update_article(
+async def update_article(
     article_slug: str,
     article: ArticleUpdate,
     session: Session,
+    loader: RequestLoader,
     current_user: CurrentUser,
 ):
-    db_article = session.scalar(
+    db_article = await session.scalar(
         select(Article).where(
             Article.slug == article_slug, Article.user_id == current_user.id
         )
@@ -326,105 +463,56 @@ def update_article(
     if article.body:
         db_article.body = article.body
 
-    # ISSUE: just adding new tags, not updated older.
-
-    if article.tag_list:
-        tag_article = session.scalars(
-            select(TagArticle).where(TagArticle.article_slug == article_slug)
-        ).all()
-        if tag_article:
-            for tag in tag_article:
-                session.delete(tag)
-                session.commit()
-
-        for tag in article.tag_list:
-            tags_to_link = session.scalar(
-                select(TagArticle).where(
-                    TagArticle.tag_name == tag,
-                    TagArticle.article_slug == article_slug,
-                )
-            )
-            if tags_to_link:
-                raise HTTPException(
-                    status_code=400, detail=f"Tag '{tag}' is duplicated"
-                )
+    stale = [f'article:{db_article.id}']
 
-            tag = TagArticle(article_slug=article_slug, tag_name=slugify(tag))
-
-            session.add(tag)
-            session.commit()
-            session.refresh(tag)
-
-        # db_article.tag_list = article.tag_list
-
-    tag_article = session.scalars(
-        select(TagArticle).where(TagArticle.article_slug == article_slug)
-    ).all()
-
-    db_article.tag_list = tag_article
-
-    session.add(db_article)
-    session.commit()
-    session.refresh(db_article)
-
-    checking_following_author = session.scalar(
-        select(Follow).where(
-            Follow.following_id == db_article.user_id,
-            Follow.user_id == current_user.id,
+    if db_article.slug != article_slug:
+        await session.execute(
+            update(TagArticle)
+            .where(TagArticle.article_slug == article_slug)
+            .values(article_slug=db_article.slug)
+        )
+        await session.execute(
+            update(PostComment)
+            .where(PostComment.article_slug == article_slug)
+            .values(article_slug=db_article.slug)
         )
-    )
 
-    following = False
-    if checking_following_author:
-        following = True
+    if article.tag_list is not None:
+        # Tags are not columns of the article, but they are part of it.
+        db_article.updated_at = utcnow()
 
-    check_user_favorite = session.scalar(
-        select(Favorites).where(
-            Favorites.favorited_by_user == current_user.username,
-            Favorites.article_id == db_article.id,
+        linked = set(
+            await session.scalars(
+                select(TagArticle.tag_name).where(
+                    TagArticle.article_slug == db_article.slug
+                )
+            )
         )
-    )
-
-    favorited = False
-    if check_user_favorite:
-        favorited = True
+        tags = tag_names(article.tag_list)
+        removed = list(linked - set(tags))
+        added = [tag for tag in tags if tag not in linked]
 
-    article_favorite = session.scalars(
-        select(Favorites).where(Favorites.article_id == db_article.id)
-    ).all()
+        await unlink_tags(session, db_article.slug, removed)
+        await link_tags(session, db_article.slug, added)
+        stale += [f'tag:{tag}' for tag in removed + added]
 
-    tags = []
-    for tag in db_article.tag_list:
-        tags.append(tag.tag_name)
+    session.add(db_article)
+    await session.commit()
+    await invalidate_articles(stale)
+    await session.refresh(db_article)
 
-    profile = Profile(
-        username=current_user.username,
-        bio=current_user.bio,
-        image=current_user.image,
-        email=current_user.email,
-        following=following,
-    )
-    article_response: PublicArticleSchema = PublicArticleSchema(
-        slug=db_article.slug,
-        title=db_article.title,
-        description=db_article.description,
-        body=db_article.body,
-        tag_list=tags,
-        created_at=db_article.created_at,
-        updated_at=db_article.updated_at,
-        author=profile,
-        favorites_count=article_favorite.__len__(),
-        favorited=favorited,
-    )
+    article_response: PublicArticleSchema = (
+        await hydrate_articles(loader, [db_article], current_user)
+    )[0]
 
     return article_response
 
 
 @router.delete('/{article_slug}', response_model=Message, status_code=200)
-def delete_article(
+async def delete_article(
     article_slug: str, session: Session, current_user: CurrentUser
 ):
-    db_article = session.scalar(
+    db_article = await session.scalar(
         select(Article).where(
             Article.slug == article_slug, Article.user_id == current_user.id
         )
@@ -432,18 +520,11 @@ def delete_article(
     if db_article is None:
         raise HTTPException(status_code=404, detail='Article not found')
 
-    comments_article = session.scalars(
-        select(Comment).where(
-            PostComment.article_slug == article_slug,
-            Comment.id == PostComment.comment_id,
-        )
-    ).all()
-    if comments_article:
-        for comment in comments_article:
-            session.delete(comment)
-            session.commit()
-
-    session.delete(db_article)
-    session.commit()
+    tags = await delete_articles(session, [db_article.id])
+    await session.commit()
+    await invalidate_articles(
+        ['all', f'author:{current_user.username}', f'article:{db_article.id}']
+        + [f'tag:{tag}' for tag in tags]
+    )
 
     return {'detail': 'Article deleted'}
@@ -1,26 +1,37 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import exists, false, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.db.database import get_session
-from api.db.models import Article, Comment, PostComment
-from api.db.schemas import CommentSchema  # Message,
+from api.db.models import Article, Comment, Follow, PostComment, User
+from api.db.pagination import MAX_LIMIT, page, seek
+from api.db.replicas import get_read_session
+from api.db.schemas import (  # Message,
+    CommentSchema,
+    MultComment,
+    Profile,
+    PublicComment,
+)
+from api.response_cache import invalidate_articles
 from api.routes.user import CurrentUser
+from api.security import Principal, get_current_user_optional
+from api.serialization import build, render
 
 router = APIRouter(prefix='/api/articles', tags=['Comments'])
-Session = Annotated[Session, Depends(get_session)]
+Session = Annotated[AsyncSession, Depends(get_session)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
 
 
 @router.post('/{article_slug}/comments', status_code=201)
-def post_comment(
+async def post_comment(
     article_slug: str,
     body: CommentSchema,
     session: Session,
     current_user: CurrentUser,
 ):
-    db_article = session.scalar(
+    db_article = await session.scalar(
         select(Article).where(Article.slug == article_slug)
     )
     if db_article is None:
@@ -30,10 +41,10 @@ def post_comment(
         body=body.body,
         created_at=func.now(),
         updated_at=func.now(),
-        author=current_user,
+        user_id=current_user.id,
     )
     session.add(comment)
-    session.commit()
+    await session.flush()
 
     post_comment: PostComment = PostComment(
         article_slug=article_slug,
@@ -41,43 +52,119 @@ def post_comment(
     )
 
     session.add(post_comment)
-    session.commit()
+    await session.execute(
+        update(Article)
+        .where(Article.id == db_article.id)
+        .values(
+            comments_count=Article.comments_count + 1,
+            # A counter is not an edit: keep updated_at's onupdate off.
+            updated_at=Article.updated_at,
+        )
+    )
+    await session.commit()
+    await invalidate_articles([f'article:{db_article.id}'])
 
-    return {'comment': comment.body}
+    return {'comment': body.body}
 
 
-@router.get('/{slug}/comments', status_code=200)
-def get_comments(slug: str, session: Session, current_user: CurrentUser):
-    db_article = session.scalar(select(Article).where(Article.slug == slug))
-    if db_article is None:
-        raise HTTPException(status_code=404, detail='Article not found')
+@router.get('/{slug}/comments', response_model=MultComment, status_code=200)
+async def get_comments(
+    slug: str,
+    session: ReadSession,
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+):
+    """
+    Read a page of an article's comments, newest first.
+
+    Comments, their authors and whether the viewer follows them come
+    from a single query per page.
+    """
+    following = false()
+    if current_user:
+        following = exists().where(
+            Follow.user_id == current_user.id,
+            Follow.following_id == Comment.user_id,
+        )
+
+    query = (
+        select(Comment, User, following.label('following'))
+        .join(PostComment, PostComment.comment_id == Comment.id)
+        .join(User, User.id == Comment.user_id)
+        .where(PostComment.article_slug == slug)
+    )
+    result = await session.execute(
+        seek(query, Comment.created_at, Comment.id, cursor, limit)
+    )
+    rows = result.all()
 
-    comments_article = session.scalars(
-        select(Comment).where(
-            Comment.id == PostComment.comment_id,
-            PostComment.article_slug == slug,
+    if not rows and not cursor:
+        article_id = await session.scalar(
+            select(Article.id).where(Article.slug == slug)
         )
-    ).all()
+        if article_id is None:
+            raise HTTPException(status_code=404, detail='Article not found')
+
+    _, next_cursor = page(rows, limit)
+    comments = [
+        build(
+            PublicComment,
+            id=comment.id,
+            body=comment.body,
+            created_at=comment.created_at,
+            updated_at=comment.updated_at,
+            author=build(
+                Profile,
+                username=author.username,
+                bio=author.bio,
+                image=author.image,
+                email=author.email,
+                following=is_following,
+            ),
+        )
+        for comment, author, is_following, *_ in rows[:limit]
+    ]
 
-    return {'comments': comments_article}
+    return render(
+        build(MultComment, comments=comments, next_cursor=next_cursor)
+    )
 
 
 @router.delete('/{slug}/comments/{id}', status_code=200)
-def delete_comment(
+async def delete_comment(
     slug: str, id: int, session: Session, current_user: CurrentUser
 ):
-    db_article = session.scalar(select(Article).where(Article.slug == slug))
+    db_article = await session.scalar(
+        select(Article).where(Article.slug == slug)
+    )
     if db_article is None:
         raise HTTPException(status_code=404, detail='Article not found')
 
-    comment_association = session.scalar(
-        select(PostComment).where(PostComment.comment_id == id)
+    comment_association = await session.scalar(
+        select(PostComment).where(
+            PostComment.article_slug == slug, PostComment.comment_id == id
+        )
     )
-    session.delete(comment_association)
+    if comment_association is None:
+        raise HTTPException(status_code=404, detail='Comment not found')
 
-    comment_article = session.scalar(select(Comment).where(Comment.id == id))
+    await session.delete(comment_association)
 
-    session.delete(comment_article)
-    session.commit()
+    comment_article = await session.scalar(
+        select(Comment).where(Comment.id == id)
+    )
+
+    await session.delete(comment_article)
+    await session.execute(
+        update(Article)
+        .where(Article.id == db_article.id)
+        .values(
+            comments_count=Article.comments_count - 1,
+            updated_at=Article.updated_at,
+        )
+    )
+    await session.commit()
+    await invalidate_articles([f'article:{db_article.id}'])
 
     return {'detail': 'Comment removed'}
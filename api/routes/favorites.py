@@ -2,27 +2,35 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from slugify import slugify
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.db.database import get_session
-from api.db.models import Article, Favorites, Follow, TagArticle
+from api.db.hydration import hydrate_articles
+from api.db.loader import Loader, get_loader
+from api.db.models import Article, Favorites, TagArticle
 from api.db.schemas import PublicArticleSchema  # Message,
-from api.routes.article import get_article
+from api.response_cache import invalidate_articles
 from api.routes.user import CurrentUser
 
 router = APIRouter(prefix='/api/articles', tags=['Favorites'])
-Session = Annotated[Session, Depends(get_session)]
+Session = Annotated[AsyncSession, Depends(get_session)]
+RequestLoader = Annotated[Loader, Depends(get_loader)]
 
 
 @router.post(
     '/{slug}/favorite', response_model=PublicArticleSchema, status_code=201
 )
-def favorite_article(session: Session, current_user: CurrentUser, slug: str):
-    article = session.scalar(select(Article).where(Article.slug == slug))
+async def favorite_article(
+    session: Session,
+    loader: RequestLoader,
+    current_user: CurrentUser,
+    slug: str,
+):
+    article = await session.scalar(select(Article).where(Article.slug == slug))
     if not article:
         raise HTTPException(status_code=404, detail='Article not exist')
-    article_to_favorite = session.scalar(
+    article_to_favorite = await session.scalar(
         select(Favorites).where(
             Favorites.favorited_by_user == current_user.username,
             Favorites.article_id == article.id,
@@ -39,55 +47,58 @@ def favorite_article(session: Session, current_user: CurrentUser, slug: str):
     )
 
     session.add(favorite)
-    session.commit()
-    session.refresh(favorite)
-
-    fav_article = get_article(slug, session)
-    fav_article.favorited = True
-
-    user_to_check = session.scalar(
-        select(Follow).where(
-            Follow.following_id == article.user_id,
-            Follow.user_id == current_user.id,
+    await session.execute(
+        update(Article)
+        .where(Article.id == article.id)
+        .values(
+            favorites_count=Article.favorites_count + 1,
+            # A counter is not an edit: keep updated_at's onupdate off.
+            updated_at=Article.updated_at,
         )
     )
+    await session.commit()
+    await invalidate_articles(
+        [f'favorited:{current_user.username}', f'article:{article.id}']
+    )
 
-    if user_to_check:
-        fav_article.author.following = True
-
-    return fav_article
+    # The update above already brought the in-session counter up to date.
+    return (await hydrate_articles(loader, [article], current_user))[0]
 
 
 @router.delete(
     '/{slug}/favorite', response_model=PublicArticleSchema, status_code=201
 )
-def unfavorite_article(session: Session, current_user: CurrentUser, slug: str):
-    article = session.scalar(select(Article).where(Article.slug == slug))
+async def unfavorite_article(
+    session: Session,
+    loader: RequestLoader,
+    current_user: CurrentUser,
+    slug: str,
+):
+    article = await session.scalar(select(Article).where(Article.slug == slug))
     if not article:
         raise HTTPException(status_code=404, detail='Article not exist')
 
-    article_to_unfavorite = session.scalar(
+    article_to_unfavorite = await session.scalar(
         select(Favorites).where(
             Favorites.favorited_by_user == current_user.username,
-            Favorites.article_slug == article.slug,
+            Favorites.article_id == article.id,
         )
     )
     if not article_to_unfavorite:
         raise HTTPException(status_code=400, detail='Article is not favorited')
 
-    session.delete(article_to_unfavorite)
-    session.commit()
-
-    fav_article = get_article(slug, session)
-
-    user_to_check = session.scalar(
-        select(Follow).where(
-            Follow.following_id == article.user_id,
-            Follow.user_id == current_user.id,
+    await session.delete(article_to_unfavorite)
+    await session.execute(
+        update(Article)
+        .where(Article.id == article.id)
+        .values(
+            favorites_count=Article.favorites_count - 1,
+            updated_at=Article.updated_at,
         )
     )
+    await session.commit()
+    await invalidate_articles(
+        [f'favorited:{current_user.username}', f'article:{article.id}']
+    )
 
-    if user_to_check:
-        fav_article.author.following = True
-
-    return fav_article
+    return (await hydrate_articles(loader, [article], current_user))[0]
@@ -1,114 +1,115 @@
-from typing import Annotated, Optional
+from typing import Annotated, Optional, Union
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.db.database import get_session
+from api.db.loader import Loader, get_loader, get_read_loader
 from api.db.models import Follow, User
 from api.db.schemas import Message, Profile
-from api.security import get_current_user, get_current_user_optional
+from api.db.timeline import backfill, catch_up, prune
+from api.security import Principal, get_current_user, get_current_user_optional
 
 router = APIRouter(prefix='/api/profiles', tags=['Profile'])
-Session = Annotated[Session, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+Session = Annotated[AsyncSession, Depends(get_session)]
+RequestLoader = Annotated[Loader, Depends(get_loader)]
+ReadLoader = Annotated[Loader, Depends(get_read_loader)]
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
+
+
+async def load_profile(
+    loader: Loader, user: Union[User, Principal], viewer: Optional[Principal]
+) -> Profile:
+    following = await loader.is_following(
+        viewer.id if viewer else None, [user.id]
+    )
+    return Profile(
+        username=user.username,
+        bio=user.bio,
+        image=user.image,
+        email=user.email,
+        following=following[user.id],
+    )
 
 
 @router.get('/{username}', response_model=Profile, status_code=200)
-def get_profile(
+async def get_profile(
     username: str,
-    session: Session,
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    loader: ReadLoader,
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
 ):
-
-    user = session.scalar(select(User).where(User.username == username))
+    user = await loader.load_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail='User not found')
 
-    following = False
-    user_to_check = None
-
-    if current_user:
-        user_to_check = session.scalar(
-            select(Follow).where(
-                Follow.following_id == user.id,
-                Follow.user_id == current_user.id,
-            )
-        )
-
-    if user_to_check:
-        following = True
-
-    profile = Profile(
-        username=user.username,
-        bio=user.bio,
-        image=user.image,
-        email=user.email,
-        following=following,
-    )
-    return profile
+    return await load_profile(loader, user, current_user)
 
 
 @router.post('/{username}/follow', response_model=Profile, status_code=201)
-def follow_user(username: str, session: Session, current_user: CurrentUser):
+async def follow_user(
+    username: str,
+    session: Session,
+    loader: RequestLoader,
+    current_user: CurrentUser,
+):
 
-    user = session.scalar(select(User).where(User.username == username))
+    user = await loader.load_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail='User not found')
 
     if not current_user:
         raise HTTPException(status_code=401, detail='User not logged in.')
 
-    user_to_follow = session.scalar(
-        select(Follow).where(
-            Follow.following_id == user.id, Follow.user_id == current_user.id
-        )
-    )
-    if user_to_follow:
+    if (await loader.is_following(current_user.id, [user.id]))[user.id]:
         raise HTTPException(status_code=400, detail='User already followed')
 
     follow = Follow(user_id=current_user.id, following_id=user.id)
 
     session.add(follow)
-    session.commit()
-    session.refresh(follow)
-
-    profile = Profile(
-        username=user.username,
-        bio=user.bio,
-        image=user.image,
-        email=user.email,
-        following=True,
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(followers_count=User.followers_count + 1)
     )
-    return profile
+    await backfill(session, current_user.id, user)
+    await session.commit()
+    loader.set_following(current_user.id, user.id, True)
+
+    return await load_profile(loader, user, current_user)
 
 
 @router.delete('/{username}/follow', response_model=Profile, status_code=201)
-def unfollow_user(username: str, session: Session, current_user: CurrentUser):
+async def unfollow_user(
+    username: str,
+    session: Session,
+    loader: RequestLoader,
+    current_user: CurrentUser,
+):
 
-    user = session.scalar(select(User).where(User.username == username))
+    user = await loader.load_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail='User not found')
 
     if not current_user:
         raise HTTPException(status_code=401, detail='User not logged in.')
 
-    user_to_unfollow = session.scalar(
-        select(Follow).where(
+    if not (await loader.is_following(current_user.id, [user.id]))[user.id]:
+        raise HTTPException(status_code=400, detail='User is not followed')
+
+    await session.execute(
+        delete(Follow).where(
             Follow.following_id == user.id, Follow.user_id == current_user.id
         )
     )
-    if not user_to_unfollow:
-        raise HTTPException(status_code=400, detail='User is not followed')
-
-    session.delete(user_to_unfollow)
-    session.commit()
-
-    profile = Profile(
-        username=user.username,
-        bio=user.bio,
-        image=user.image,
-        email=user.email,
-        following=False,
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(followers_count=User.followers_count - 1)
     )
-    return profile
+    await prune(session, current_user.id, user.id)
+    await catch_up(session, [user.id])
+    await session.commit()
+    loader.set_following(current_user.id, user.id, False)
+
+    return await load_profile(loader, user, current_user)
@@ -1,20 +1,35 @@
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.db.database import get_session
-from api.db.models import TagArticle
+from api.conditional import cache_control
+from api.db.models import TagStats
+from api.db.pagination import MAX_LIMIT, MAX_OFFSET
+from api.db.replicas import get_read_session
 
 router = APIRouter(prefix='/api/tags', tags=['Tags'])
-Session = Annotated[Session, Depends(get_session)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
 
 
-@router.get('/', status_code=200)
-def get_tags(
-    session: Session, offset: Optional[int] = 0, limit: Optional[int] = 20
+@router.get(
+    '/', status_code=200, dependencies=[Depends(cache_control('get_tags'))]
+)
+async def get_tags(
+    session: ReadSession,
+    prefix: Optional[str] = None,
+    offset: int = Query(0, ge=0, le=MAX_OFFSET),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
 ):
-    db_tags = session.scalars(select(TagArticle.tag_name)).all()
-    tags = set(db_tags)
-    return {'tags': tags}
+    query = select(TagStats.name)
+
+    if prefix:
+        query = query.where(TagStats.name.startswith(prefix, autoescape=True))
+
+    tags = await session.scalars(
+        query.order_by(TagStats.articles_count.desc(), TagStats.name)
+        .offset(offset)
+        .limit(limit)
+    )
+    return {'tags': tags.all()}
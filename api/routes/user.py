@@ -1,12 +1,21 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Response,
+)
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.db import purge
 from api.db.database import get_session
-from api.db.models import User
+from api.db.loader import Loader, get_loader
+from api.db.models import User, utcnow
 from api.db.schemas import (
     Message,
     Token,
@@ -16,41 +25,66 @@ from api.db.schemas import (
     UserSchema,
     UserUpdate,
 )
+from api.metrics import LatencyStats
+from api.response_cache import article_list_cache, invalidate_articles
 from api.security import (
+    Principal,
     create_access_token,
     get_current_user,
-    get_password_hash,
-    verify_password,
+    invalidate_principal,
+    password_hasher,
 )
+from api.settings import get_settings
 
 router = APIRouter(prefix='/api', tags=['User and Authentication'])
-Session = Annotated[Session, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+Session = Annotated[AsyncSession, Depends(get_session)]
+RequestLoader = Annotated[Loader, Depends(get_loader)]
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
 OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
+settings = get_settings()
+
+
+login_latency = LatencyStats()
 
 
 @router.post('/users/login', response_model=Token)
-def login_for_access_token(form_data: OAuth2Form, session: Session):
-    user = session.scalar(select(User).where(User.email == form_data.username))
+async def login_for_access_token(form_data: OAuth2Form, session: Session):
+    with login_latency.time():
+        return await authenticate(form_data, session)
+
+
+async def authenticate(form_data: OAuth2Form, session: Session):
+    user = await session.scalar(
+        select(User).where(
+            User.email == form_data.username, User.deleted_at.is_(None)
+        )
+    )
 
     if not user:
         raise HTTPException(
             status_code=400, detail='Incorrect email or password'
         )
 
-    if not verify_password(form_data.password, user.password):
+    verified, new_hash = await password_hasher.verify_and_update(
+        form_data.password, user.password
+    )
+    if not verified:
         raise HTTPException(
             status_code=400, detail='Incorrect email or password'
         )
 
+    if new_hash:
+        user.password = new_hash
+        await session.commit()
+
     access_token = create_access_token(data={'sub': user.email})
 
     return {'access_token': access_token, 'token_type': 'bearer'}
 
 
 @router.post('/refresh_token', response_model=Token)
-def refresh_access_token(
-    user: User = Depends(get_current_user),
+async def refresh_access_token(
+    user: Principal = Depends(get_current_user),
 ):
     new_access_token = create_access_token(data={'sub': user.email})
 
@@ -58,17 +92,23 @@ def refresh_access_token(
 
 
 @router.post('/users', response_model=UserPublic, status_code=201)
-def create_user(user: UserSchema, session: Session):
-    db_user = session.scalar(
-        select(User).where(User.username == user.username)
+async def create_user(user: UserSchema, session: Session):
+    db_user = await session.scalar(
+        select(User).where(
+            (User.username == user.username.lower())
+            | (User.email == user.email)
+        )
     )
 
-    if db_user:
+    if db_user and db_user.username == user.username.lower():
         raise HTTPException(
             status_code=400, detail='Username already registered'
         )
 
-    hashed_password = get_password_hash(user.password)
+    if db_user:
+        raise HTTPException(status_code=400, detail='Email already registered')
+
+    hashed_password = await password_hasher.hash(user.password)
 
     db_user = User(
         username=user.username.lower(),
@@ -79,14 +119,14 @@ def create_user(user: UserSchema, session: Session):
     )
 
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
 
     return db_user
 
 
 @router.get('/user', response_model=UserPrivate, status_code=200)
-def get_user(
+async def get_user(
     current_user: CurrentUser,
     token: str = Depends(OAuth2PasswordBearer(tokenUrl='token')),
 ):
@@ -103,15 +143,18 @@ def get_user(
 
 
 @router.get('/user/list', response_model=UserList, status_code=200)
-def read_user(session: Session, skip: int = 0, limit: int = 100):
-    users = session.scalars(select(User).offset(skip).limit(limit)).all()
+async def read_user(session: Session, skip: int = 0, limit: int = 100):
+    users = (
+        await session.scalars(select(User).offset(skip).limit(limit))
+    ).all()
     return {'users': users}
 
 
 @router.put('/user', response_model=UserPublic)
-def update_user(
+async def update_user(
     user: UserUpdate,
     session: Session,
+    loader: RequestLoader,
     current_user: CurrentUser,
 ):
     """
@@ -122,18 +165,75 @@ def update_user(
     current_user.image = user.image
     """
 
-    for key, value in user.model_dump(exclude_unset=True).items():
-        setattr(current_user, key, value)
+    db_user = await loader.load_user(current_user.id)
 
-    session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    changes = user.model_dump(exclude_unset=True)
+    if changes.get('password'):
+        changes['password'] = await password_hasher.hash(changes['password'])
 
-    return current_user
+    for key, value in changes.items():
+        setattr(db_user, key, value)
+
+    session.add(db_user)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=400, detail='Username or email already registered'
+        )
+
+    await session.refresh(db_user)
+    invalidate_principal(current_user.id)
+    await invalidate_articles(
+        [
+            f'user:{current_user.id}',
+            f'author:{current_user.username}',
+            f'author:{db_user.username}',
+        ]
+    )
+
+    return db_user
 
 
 @router.delete('/user', response_model=Message)
-def delete_user(session: Session, current_user: CurrentUser):
-    session.delete(current_user)
-    session.commit()
+async def delete_user(
+    session: Session,
+    current_user: CurrentUser,
+    response: Response,
+    background_tasks: BackgroundTasks,
+):
+    """
+    Delete the account with its articles, comments, favorites and follows.
+
+    Accounts with more than USER_DELETE_MAX_ROWS such rows are closed at
+    once and answered with 202; their rows are then purged in chunks
+    after the response, and are still visible until they are.
+    """
+    rows = await purge.count_user_rows(
+        session,
+        current_user.id,
+        current_user.username,
+        limit=settings.USER_DELETE_MAX_ROWS + 1,
+    )
+
+    if rows > settings.USER_DELETE_MAX_ROWS:
+        await session.execute(
+            update(User)
+            .where(User.id == current_user.id)
+            .values(deleted_at=utcnow())
+        )
+        await session.commit()
+        invalidate_principal(current_user.id)
+        background_tasks.add_task(
+            purge.purge_user, current_user.id, current_user.username
+        )
+        response.status_code = 202
+        return {'detail': 'User deletion scheduled'}
+
+    await purge.delete_user(session, current_user.id, current_user.username)
+    await session.commit()
+    invalidate_principal(current_user.id)
+    # Their articles, comments and favorites may be on any page.
+    await article_list_cache.clear()
     return {'detail': 'User deleted'}
@@ -1,4 +1,10 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from time import time
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
@@ -6,16 +12,45 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
+from api.cache import TTLCache
 from api.db.database import get_session
 from api.db.models import User
 from api.db.schemas import TokenData
-from api.settings import Settings
+from api.metrics import LatencyStats
+from api.settings import get_settings
 
-settings = Settings()
+settings = get_settings()
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+pwd_context = CryptContext(
+    schemes=['bcrypt'],
+    deprecated='auto',
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated user, detached from any session."""
+
+    id: int
+    username: str
+    email: str
+    bio: Optional[str]
+    image: Optional[str]
+
+
+# Maps a bearer token to its Principal, so an authenticated request
+# usually neither verifies the signature nor looks the user up again.
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.remove_where(lambda principal: principal.id == user_id)
 
 
 def create_access_token(data: dict):
@@ -38,13 +73,116 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Verify a password and, when its hash uses outdated settings such as
+    a different bcrypt cost, also return a fresh hash to store."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def worker_pid() -> int:
+    return os.getpid()
+
+
+class PasswordHasher:
+    """
+    Run bcrypt on a dedicated process pool.
+
+    Hashing is CPU bound and takes hundreds of milliseconds, so it is kept
+    off the event loop and the request threadpool. At most `max_pending`
+    jobs are handed to the pool; further callers wait on the event loop.
+    With no workers configured, jobs run in the threadpool instead.
+    """
+
+    def __init__(self, workers: Optional[int], max_pending: int):
+        self.workers = workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.slots = asyncio.Semaphore(max_pending)
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.latency = LatencyStats()
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        # Created on first use so that importing this module, as the
+        # spawned workers themselves do, never starts processes.
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers or None,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self.pool
+
+    async def run(self, fn, *args):
+        self.queue_depth += 1
+        self.queue_depth_max = max(self.queue_depth_max, self.queue_depth)
+        try:
+            with self.latency.time():
+                async with self.slots:
+                    if self.workers == 0:
+                        return await run_in_threadpool(fn, *args)
+
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self.get_pool(), fn, *args
+                    )
+        finally:
+            self.queue_depth -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, Optional[str]]:
+        return await self.run(
+            verify_and_update_password, plain_password, hashed_password
+        )
+
+    async def warm_up(self):
+        """
+        Start a worker and have it import this module, which the first
+        login would otherwise wait for.
+        """
+        if self.workers == 0:
+            return
+
+        await asyncio.get_running_loop().run_in_executor(
+            self.get_pool(), worker_pid
+        )
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'queue_depth_max': self.queue_depth_max,
+            'latency': self.latency.stats(),
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='token')
+# Lets anonymous requests through instead of answering 401.
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl='token', auto_error=False
+)
 
 
 async def get_current_user(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     token: str = Depends(oauth2_scheme),
-):
+) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail='Could not validate credentials',
@@ -62,20 +200,34 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = session.scalar(
-        select(User).where(User.email == token_data.username)
+    user = await session.scalar(
+        select(User).where(
+            User.email == token_data.username, User.deleted_at.is_(None)
+        )
     )
 
     if user is None:
         raise credentials_exception
 
-    return user
+    principal = Principal(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        bio=user.bio,
+        image=user.image,
+    )
+    principal_cache.set(token, principal, ttl=payload['exp'] - time())
+
+    return principal
 
 
 async def get_current_user_optional(
-    session: Session = Depends(get_session),
-    token: Optional[str] = Depends(oauth2_scheme),
-):
+    session: AsyncSession = Depends(get_session),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> Optional[Principal]:
+    if token is None:
+        return None
+
     try:
         user = await get_current_user(session, token)
         return user
@@ -0,0 +1,58 @@
+from typing import Optional, Union
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from api.settings import get_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+settings = get_settings()
+
+
+def dump_json(model: BaseModel) -> bytes:
+    """
+    Serialize a response model to JSON bytes.
+
+    orjson over `model_dump()` produces the same bytes as
+    `model_dump_json()` and is usually faster, so it is used when
+    installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(model.model_dump())
+
+    return model.model_dump_json().encode()
+
+
+def render(
+    model: BaseModel,
+    status_code: int = 200,
+    headers: Optional[dict[str, str]] = None,
+) -> Union[BaseModel, Response]:
+    """
+    Send `model` as the response.
+
+    With FAST_JSON the model, built once from trusted data, is written
+    out directly; otherwise it is returned for FastAPI to validate against
+    the route's `response_model` and encode, as usual.
+    """
+    if not settings.FAST_JSON:
+        return model
+
+    return Response(
+        dump_json(model),
+        status_code=status_code,
+        media_type='application/json',
+        headers=headers,
+    )
+
+
+def build(model_class: type[BaseModel], **values) -> BaseModel:
+    """Instantiate a response model, skipping validation with FAST_JSON."""
+    if settings.FAST_JSON:
+        return model_class.model_construct(**values)
+
+    return model_class(**values)
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Optional, Union
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,6 +10,102 @@ class Settings(BaseSettings):
     )
 
     DB_URL: str
+    # Use the async driver (DB_ASYNC_URL, or aiosqlite for a sqlite DB_URL);
+    # when off, the sync driver runs in the threadpool.
+    DB_ASYNC: bool = True
+    DB_ASYNC_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = -1
+    # Read-only copies of the database, as sync URLs like DB_URL. GET
+    # routes that can do with slightly stale data read from them in turn,
+    # skipping any failing its health check; with none, or none healthy,
+    # they read from DB_URL.
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = 5
+    # A client that wrote reads from DB_URL for this long afterwards, to
+    # see its own writes however far behind the replicas are.
+    DB_READ_YOUR_WRITES_SECONDS: int = 10
+    # Before reporting ready, open the pool's connections, configure the
+    # mappers, run the route queries once and start a hashing worker.
+    WARM_UP: bool = True
+    # Applied to every new SQLite connection; WAL lets readers run
+    # alongside a writer and busy_timeout makes writers queue instead of
+    # failing with "database is locked".
+    SQLITE_PRAGMAS: dict[str, Union[int, str]] = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 268_435_456,
+        'cache_size': -64_000,
+    }
+    # Statements taking at least this long are logged with their
+    # parameters on the `api.sql` logger; None turns the log off.
+    SQL_SLOW_QUERY_SECONDS: Optional[float] = 0.1
+    # Track statement shapes per request and warn about any run at least
+    # SQL_REPEATED_STATEMENT_THRESHOLD times, a sign of N+1 queries.
+    SQL_DEBUG: bool = False
+    SQL_REPEATED_STATEMENT_THRESHOLD: int = 5
+    # With several workers (PROMETHEUS_MULTIPROC_DIR set), how often each
+    # copies its pool, cache and hasher state into the shared gauges.
+    METRICS_REFRESH_SECONDS: float = 5
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # Entries are dropped on profile changes only in the process that made
+    # them, so the TTL bounds how stale other workers can be.
+    AUTH_CACHE_SIZE: int = 10_000
+    AUTH_CACHE_TTL_SECONDS: float = 60
+    # Stored hashes with another cost are upgraded on the next login.
+    BCRYPT_ROUNDS: int = 12
+    # Size of the bcrypt process pool; unset uses every core and 0 hashes
+    # in the threadpool instead.
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Authors with more followers than this are pulled into feeds on read
+    # instead of being fanned out to every follower's timeline on write.
+    FEED_FANOUT_MAX_FOLLOWERS: int = 10_000
+
+    # POST /api/articles/bulk commits this many articles at a time, unless
+    # the request asks for another batch size. Lines longer than the limit
+    # are rejected without being buffered, and only the first errors are
+    # listed in the response, so memory stays bounded whatever the upload.
+    BULK_IMPORT_BATCH_SIZE: int = 500
+    BULK_IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+    BULK_IMPORT_MAX_ERRORS: int = 1000
+    # Deleting a user owning more rows than this (articles, comments,
+    # favorites, follows) disables the account at once and deletes its
+    # rows in the background, committing USER_PURGE_CHUNK_SIZE at a time.
+    USER_DELETE_MAX_ROWS: int = 5_000
+    USER_PURGE_CHUNK_SIZE: int = 500
+    # Rows GET /api/articles/export reads from its cursor, and tags for,
+    # at a time.
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # Serialized article list pages served to anonymous readers; writes
+    # invalidate the pages they affect, the TTL bounds everything else.
+    # A size of 0 disables the cache.
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    RESPONSE_CACHE_TTL_SECONDS: float = 30
+
+    # Build read responses without validation and write them straight to
+    # JSON (with orjson when installed), instead of letting FastAPI
+    # validate and encode them again against the response_model.
+    FAST_JSON: bool = False
+
+    # Cache-Control sent by each route, keyed by route name; routes
+    # without an entry send none. Articles carry an ETag, so shared caches
+    # may keep them as long as they revalidate.
+    CACHE_CONTROL: dict[str, str] = {
+        'get_article': 'public, no-cache',
+        'get_tags': 'public, max-age=60',
+    }
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """The settings, read from the environment and `.env` once."""
+    return Settings()
@@ -0,0 +1,355 @@
+"""
+Load test of the read endpoints against seeded databases.
+
+Each endpoint gets `--requests` requests from `--concurrency` concurrent
+clients, after a short warm-up, and is reported as throughput and
+p50/p95/p99 latency in JSON. Requests go through the ASGI app in-process,
+or over HTTP to a uvicorn server started for the run with `--uvicorn`.
+
+    python benchmarks/load.py --size small --size medium -o results.json
+    python benchmarks/load.py --db bench.db --uvicorn --workers 4
+
+Databases for `--size` are seeded once by seed.py into benchmarks/data/
+and reused by later runs; only reads are sent, so they stay as seeded.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+from statistics import quantiles
+from time import perf_counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DATA = os.path.join(HERE, 'data')
+
+sys.path.insert(0, ROOT)
+
+
+def endpoints(parameters: dict) -> dict[str, tuple[str, dict, bool]]:
+    """Name to `(path, query, authenticated)` of every measured request."""
+    slug = parameters['slug']
+    return {
+        'list articles': ('/api/articles/', {}, False),
+        'list articles, authenticated': ('/api/articles/', {}, True),
+        'list articles by tag': (
+            '/api/articles/',
+            {'tag': parameters['tag']},
+            True,
+        ),
+        'list articles by author': (
+            '/api/articles/',
+            {'author': parameters['author']},
+            True,
+        ),
+        'feed': ('/api/articles/feed', {}, True),
+        'get article': (f'/api/articles/{slug}', {}, True),
+        'list comments': (f'/api/articles/{slug}/comments', {}, True),
+        'search': ('/api/articles/search', {'q': parameters['q']}, False),
+        'get profile': (
+            f'/api/profiles/{parameters["author"]}',
+            {},
+            True,
+        ),
+        'tags': ('/api/tags/', {}, False),
+    }
+
+
+def pick_parameters(url: str) -> dict:
+    """The heaviest tag, author, reader and article of the database."""
+    from sqlalchemy import create_engine, func, select
+
+    from api.db.models import Article, Follow, TagStats, User
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        tag = connection.scalar(
+            select(TagStats.name)
+            .order_by(TagStats.articles_count.desc())
+            .limit(1)
+        )
+        author = connection.scalar(
+            select(User.username)
+            .join(Article, Article.user_id == User.id)
+            .group_by(User.id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+        reader = connection.scalar(
+            select(User.email)
+            .join(Follow, Follow.user_id == User.id)
+            .group_by(User.id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+        slug = connection.scalar(
+            select(Article.slug)
+            .order_by(Article.comments_count.desc())
+            .limit(1)
+        )
+        counts = {
+            model.__tablename__: connection.scalar(
+                select(func.count()).select_from(model)
+            )
+            for model in (User, Article, Follow)
+        }
+    engine.dispose()
+
+    return {
+        'tag': tag,
+        'author': author,
+        'reader': reader,
+        'slug': slug,
+        'q': 'dragon training',
+        'counts': counts,
+    }
+
+
+async def measure(client, path, query, headers, requests, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = perf_counter()
+            response = await client.get(path, params=query, headers=headers)
+            latencies.append(perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - started
+
+    p50, p95, p99 = (
+        quantiles(latencies, n=100, method='inclusive')[index] * 1000
+        for index in (49, 94, 98)
+    )
+    return {
+        'requests': requests,
+        'errors': errors,
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(p50, 2),
+        'p95_ms': round(p95, 2),
+        'p99_ms': round(p99, 2),
+    }
+
+
+async def run_endpoints(client, parameters, args) -> dict:
+    from api.security import create_access_token
+
+    token = create_access_token(data={'sub': parameters['reader']})
+    authorization = {'Authorization': f'Bearer {token}'}
+
+    results = {}
+    for name, (path, query, authenticated) in endpoints(parameters).items():
+        headers = authorization if authenticated else {}
+        await measure(
+            client, path, query, headers, args.warmup, args.concurrency
+        )
+        results[name] = await measure(
+            client, path, query, headers, args.requests, args.concurrency
+        )
+        print(f'  {name:30} {results[name]}', file=sys.stderr)
+
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def serve(args):
+    """Start uvicorn on a free port; returns the process and its URL."""
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            '-m',
+            'uvicorn',
+            'api.app:app',
+            '--port',
+            str(port),
+            '--workers',
+            str(args.workers),
+            '--log-level',
+            'warning',
+            '--no-access-log',
+        ],
+        cwd=ROOT,
+        env=os.environ.copy(),
+    )
+    base_url = f'http://127.0.0.1:{port}'
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            try:
+                await client.get('/health-check')
+                return server, base_url
+            except httpx.TransportError:
+                if server.poll() is not None:
+                    break
+                await asyncio.sleep(0.1)
+
+    server.terminate()
+    raise SystemExit('uvicorn did not start')
+
+
+async def run_database(args) -> dict:
+    url = f'sqlite:///{os.path.abspath(args.db)}'
+    # The api modules bind their engines to DB_URL when first imported.
+    os.environ['DB_URL'] = url
+
+    import httpx
+
+    from api.settings import get_settings
+
+    parameters = pick_parameters(url)
+    settings = get_settings()
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    if args.uvicorn:
+        server, base_url = await serve(args)
+        try:
+            async with httpx.AsyncClient(
+                base_url=base_url, limits=limits, timeout=60
+            ) as client:
+                results = await run_endpoints(client, parameters, args)
+        finally:
+            server.terminate()
+            server.wait()
+    else:
+        from api.app import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url='http://bench', timeout=60
+        ) as client:
+            results = await run_endpoints(client, parameters, args)
+
+    return {
+        'database': os.path.basename(args.db),
+        'rows': parameters.pop('counts'),
+        'parameters': parameters,
+        'mode': 'uvicorn' if args.uvicorn else 'in-process',
+        'workers': args.workers if args.uvicorn else None,
+        'concurrency': args.concurrency,
+        'settings': {
+            name: getattr(settings, name)
+            for name in (
+                'DB_ASYNC',
+                'DB_POOL_SIZE',
+                'FAST_JSON',
+                'RESPONSE_CACHE_MAX_BYTES',
+            )
+        },
+        'endpoints': results,
+    }
+
+
+def seeded(size: str) -> str:
+    path = os.path.join(DATA, f'{size}.db')
+    if not os.path.exists(path):
+        os.makedirs(DATA, exist_ok=True)
+        subprocess.run(
+            [
+                sys.executable,
+                os.path.join(HERE, 'seed.py'),
+                path,
+                '--size',
+                size,
+            ],
+            check=True,
+            stdout=sys.stderr,
+        )
+
+    return path
+
+
+def run_size(size: str, argv: list[str]) -> dict:
+    """Measure one seeded database in a fresh interpreter."""
+    print(f'{size}:', file=sys.stderr)
+    output = subprocess.run(
+        [sys.executable, __file__, '--db', seeded(size), *argv],
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    return {'size': size, **json.loads(output)['runs'][0]}
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--db', help='seeded SQLite file to measure')
+    target.add_argument(
+        '--size',
+        action='append',
+        choices=('small', 'medium', 'large'),
+        help='seed.py size to measure, repeatable',
+    )
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument(
+        '--uvicorn',
+        action='store_true',
+        help='go over HTTP to a uvicorn server instead of in-process',
+    )
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('-o', '--output', help='write the JSON here')
+    args = parser.parse_args(argv)
+
+    if args.db:
+        runs = [asyncio.run(run_database(args))]
+    else:
+        # Everything but the target is passed on to each run.
+        passed = [
+            f'--requests={args.requests}',
+            f'--warmup={args.warmup}',
+            f'--concurrency={args.concurrency}',
+            f'--workers={args.workers}',
+        ]
+        if args.uvicorn:
+            passed.append('--uvicorn')
+        runs = [run_size(size, passed) for size in args.size]
+
+    report = json.dumps(
+        {
+            'commit': commit(),
+            'python': platform.python_version(),
+            'runs': runs,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Fill a fresh database with synthetic users, articles and activity.
+
+Popularity is skewed the way real traffic is: a few authors write most
+articles and gather most followers, and a few tags and articles get most
+of the use, each drawn from a Zipf-like distribution. The same --seed
+always produces the same data.
+
+    python benchmarks/seed.py benchmarks/data/medium.db --size medium
+    python benchmarks/seed.py bench.db --users 5000 --articles 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import accumulate
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+SIZES = {
+    'small': {
+        'users': 200,
+        'articles': 2_000,
+        'tags': 100,
+        'follows': 10,
+        'favorites': 20,
+        'comments': 5,
+    },
+    'medium': {
+        'users': 2_000,
+        'articles': 20_000,
+        'tags': 500,
+        'follows': 20,
+        'favorites': 30,
+        'comments': 5,
+    },
+    'large': {
+        'users': 20_000,
+        'articles': 200_000,
+        'tags': 2_000,
+        'follows': 30,
+        'favorites': 40,
+        'comments': 5,
+    },
+}
+BATCH = 5_000
+WORDS = (
+    'dragon training jacobian async database index cache latency '
+    'throughput python fastapi sqlite query page cursor feed token '
+    'profile follow favorite comment article tag search benchmark '
+    'schema migration replica pool worker process thread queue'
+).split()
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    """Cumulative weights making rank `i` about `1 / i**exponent` likely."""
+    return list(
+        accumulate(1 / rank**exponent for rank in range(1, count + 1))
+    )
+
+
+def words(rng: random.Random, count: int) -> str:
+    return ' '.join(rng.choices(WORDS, k=count))
+
+
+def insert(connection, table, rows: list[dict]):
+    for start in range(0, len(rows), BATCH):
+        connection.execute(table.insert(), rows[start : start + BATCH])
+
+
+def seed(url: str, sizes: dict, seed: int, exponent: float) -> dict:
+    """Create the schema at `url` and fill it; returns the row counts."""
+    # The api modules bind their engines to DB_URL when first imported.
+    os.environ['DB_URL'] = url
+
+    from sqlalchemy import create_engine, func, select
+
+    from api.db import search  # noqa: F401, registers the FTS DDL
+    from api.db.models import (
+        Article,
+        Base,
+        Comment,
+        Favorites,
+        Follow,
+        PostComment,
+        Tag,
+        TagArticle,
+        User,
+    )
+    from api.security import get_password_hash
+
+    rng = random.Random(seed)
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    users = range(1, sizes['users'] + 1)
+    user_weights = zipf_weights(sizes['users'], exponent)
+    tag_names = [
+        f'{rng.choice(WORDS)}-{index}' for index in range(sizes['tags'])
+    ]
+    tag_weights = zipf_weights(sizes['tags'], exponent)
+    article_weights = zipf_weights(sizes['articles'], exponent)
+
+    # Every account shares one hash: bcrypt would dominate seeding time.
+    password = get_password_hash('password')
+    started_at = datetime(2024, 1, 1)
+    step = timedelta(days=365) / max(sizes['articles'], 1)
+
+    with engine.begin() as connection:
+        insert(
+            connection,
+            User.__table__,
+            [
+                {
+                    'id': user,
+                    'username': f'user{user}',
+                    'email': f'user{user}@example.com',
+                    'password': password,
+                    'bio': words(rng, 8),
+                    'image': f'https://example.com/avatars/{user}.png',
+                }
+                for user in users
+            ],
+        )
+
+        follows = set()
+        for user in users:
+            for followed in rng.choices(
+                users, cum_weights=user_weights, k=sizes['follows']
+            ):
+                if followed != user:
+                    follows.add((user, followed))
+        insert(
+            connection,
+            Follow.__table__,
+            [
+                {'user_id': user, 'following_id': followed}
+                for user, followed in follows
+            ],
+        )
+
+        authors = rng.choices(
+            users, cum_weights=user_weights, k=sizes['articles']
+        )
+        articles = []
+        for index, author in enumerate(authors, start=1):
+            created_at = started_at + step * index
+            articles.append(
+                {
+                    'id': index,
+                    'slug': f'article-{index}',
+                    'title': f'{words(rng, 5).capitalize()} {index}',
+                    'description': words(rng, 12),
+                    'body': words(rng, rng.randint(100, 800)),
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                    'user_id': author,
+                }
+            )
+        insert(connection, Article.__table__, articles)
+
+        insert(
+            connection,
+            Tag.__table__,
+            [{'name': name} for name in tag_names],
+        )
+        insert(
+            connection,
+            TagArticle.__table__,
+            [
+                {'article_slug': article['slug'], 'tag_name': name}
+                for article in articles
+                for name in set(
+                    rng.choices(
+                        tag_names,
+                        cum_weights=tag_weights,
+                        k=rng.randint(1, 5),
+                    )
+                )
+            ],
+        )
+
+        # Popularity does not follow age.
+        popular = articles.copy()
+        rng.shuffle(popular)
+
+        favorites = set()
+        for user in users:
+            for article in rng.choices(
+                popular, cum_weights=article_weights, k=sizes['favorites']
+            ):
+                favorites.add((article['id'], f'user{user}'))
+        insert(
+            connection,
+            Favorites.__table__,
+            [
+                {'article_id': article_id, 'favorited_by_user': username}
+                for article_id, username in favorites
+            ],
+        )
+
+        comments = []
+        links = []
+        for article in rng.choices(
+            popular,
+            cum_weights=article_weights,
+            k=sizes['articles'] * sizes['comments'],
+        ):
+            comment_id = len(comments) + 1
+            created_at = article['created_at'] + timedelta(
+                minutes=rng.randint(1, 60 * 24 * 30)
+            )
+            comments.append(
+                {
+                    'id': comment_id,
+                    'body': words(rng, rng.randint(5, 60)),
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                    'user_id': rng.choice(users),
+                }
+            )
+            links.append(
+                {'article_slug': article['slug'], 'comment_id': comment_id}
+            )
+        insert(connection, Comment.__table__, comments)
+        insert(connection, PostComment.__table__, links)
+
+    asyncio.run(derive())
+
+    with engine.connect() as connection:
+        counts = {
+            model.__tablename__: connection.scalar(
+                select(func.count()).select_from(model)
+            )
+            for model in (
+                User,
+                Follow,
+                Article,
+                Tag,
+                TagArticle,
+                Favorites,
+                Comment,
+            )
+        }
+    engine.dispose()
+
+    return counts
+
+
+async def derive():
+    """Fill the counters, timelines and search index from the raw rows."""
+    from api.cli import rebuild_search, rebuild_timelines, repair_counters
+    from api.db.database import open_session
+
+    async with open_session() as session:
+        await repair_counters(session)
+        await rebuild_timelines(session)
+        await rebuild_search(session)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='SQLite file to create')
+    parser.add_argument('--size', choices=SIZES, default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--exponent',
+        type=float,
+        default=1.1,
+        help='skew of authors, tags and articles popularity',
+    )
+    for name, help in (
+        ('users', 'number of users'),
+        ('articles', 'number of articles'),
+        ('tags', 'number of distinct tags'),
+        ('follows', 'follows drawn per user'),
+        ('favorites', 'favorites drawn per user'),
+        ('comments', 'comments per article, on average'),
+    ):
+        parser.add_argument(
+            f'--{name}', type=int, help=f'{help}, overrides --size'
+        )
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.path):
+        parser.error(f'{args.path} already exists')
+
+    sizes = {
+        name: default if getattr(args, name) is None else getattr(args, name)
+        for name, default in SIZES[args.size].items()
+    }
+
+    started = perf_counter()
+    counts = seed(
+        f'sqlite:///{os.path.abspath(args.path)}',
+        sizes,
+        args.seed,
+        args.exponent,
+    )
+    print(f'seeded {args.path} in {perf_counter() - started:.1f}s')
+    for table, count in counts.items():
+        print(f'{table:22} {count:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Microbenchmark of the article page serialization paths.
+
+Builds and serializes a page of articles the way FastAPI does by default
+(validated models, then `response_model` validation, `jsonable_encoder`
+and `json.dumps`), and the way the FAST_JSON path does (unvalidated
+models written out once).
+
+    python benchmarks/serialization.py --articles 100 --repeat 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Settings are read at import time; none of these are used here.
+os.environ.setdefault('DB_URL', 'sqlite://')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('ALGORITHM', 'HS256')
+os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from api.db.schemas import PublicArticleSchema  # noqa: E402
+from api.db.schemas import MultArticle, Profile  # noqa: E402
+from api.serialization import dump_json, orjson  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 30)
+
+
+def article_values(index: int) -> dict:
+    return {
+        'slug': f'how-to-train-your-dragon-{index}',
+        'title': f'How to train your dragon {index}',
+        'description': 'Ever wonder how? ' * 4,
+        'body': 'It takes a Jacobian. ' * 100,
+        'tag_list': ['dragons', 'training', 'howto'],
+        'created_at': NOW,
+        'updated_at': NOW,
+        'favorited': index % 3 == 0,
+        'favorites_count': index,
+        'comments_count': index % 7,
+    }
+
+
+def author_values(index: int) -> dict:
+    return {
+        'username': f'jake{index % 10}',
+        'email': f'jake{index % 10}@jake.jake',
+        'bio': 'I work at statefarm',
+        'image': 'https://i.stack.imgur.com/xHWG8.jpg',
+        'following': index % 2 == 0,
+    }
+
+
+def build_page(articles: int, construct) -> MultArticle:
+    return construct(
+        MultArticle,
+        articles=[
+            construct(
+                PublicArticleSchema,
+                **article_values(index),
+                author=construct(Profile, **author_values(index)),
+            )
+            for index in range(articles)
+        ],
+        articles_count=articles,
+    )
+
+
+def validated(model_class, **values):
+    return model_class(**values)
+
+
+def constructed(model_class, **values):
+    return model_class.model_construct(**values)
+
+
+async def fastapi_default(articles: int) -> bytes:
+    page = build_page(articles, validated)
+    content = await serialize_response(
+        field=RESPONSE_FIELD, response_content=page
+    )
+    return JSONResponse(content).body
+
+
+async def fast_path(articles: int) -> bytes:
+    return dump_json(build_page(articles, constructed))
+
+
+async def fast_path_model_dump_json(articles: int) -> bytes:
+    return build_page(articles, constructed).model_dump_json().encode()
+
+
+RESPONSE_FIELD = create_response_field(name='Response', type_=MultArticle)
+
+
+async def measure(path, articles: int, repeat: int) -> float:
+    await path(articles)
+    started = perf_counter()
+    for _ in range(repeat):
+        await path(articles)
+
+    return (perf_counter() - started) / repeat
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--articles', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    paths = {
+        'fastapi default': fastapi_default,
+        'fast path, model_dump_json': fast_path_model_dump_json,
+    }
+    if orjson is not None:
+        paths['fast path, orjson'] = fast_path
+
+    results = {
+        name: await measure(path, args.articles, args.repeat)
+        for name, path in paths.items()
+    }
+
+    print(f'{args.articles} articles per page, {args.repeat} pages')
+    for name, seconds in results.items():
+        print(
+            f'{name:28} {seconds * 1000:8.3f} ms/page'
+            f'  {results["fastapi default"] / seconds:5.2f}x'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
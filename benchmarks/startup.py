@@ -0,0 +1,158 @@
+"""
+Startup cost of the API: import time, and time to first byte of a fresh
+uvicorn server, with and without the lifespan warm-up.
+
+Import time is measured in fresh interpreters. Each server run starts
+uvicorn, polls /health-check/ready until it answers 200, then times the
+first byte of two article list requests: the first pays for whatever
+warm-up did not do. Every measure is the median of `--runs` runs,
+reported in JSON.
+
+    python benchmarks/startup.py --size small
+    python benchmarks/startup.py --db bench.db --runs 10 -o startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter, sleep
+
+from load import ROOT, commit, free_port, seeded
+
+IMPORT = (
+    'from time import perf_counter; started = perf_counter(); '
+    'import api.app; print(perf_counter() - started)'
+)
+
+
+def import_seconds(env: dict) -> float:
+    """Seconds `import api.app` takes in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output)
+
+
+def boot(env: dict) -> dict:
+    """Start uvicorn and time it up to its second article list response."""
+    import httpx
+
+    port = free_port()
+    started = perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            '-m',
+            'uvicorn',
+            'api.app:app',
+            '--port',
+            str(port),
+            '--log-level',
+            'warning',
+            '--no-access-log',
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        with httpx.Client(
+            base_url=f'http://127.0.0.1:{port}', timeout=60
+        ) as client:
+            while True:
+                try:
+                    if client.get('/health-check/ready').status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise SystemExit('uvicorn did not start')
+                sleep(0.01)
+            ready = perf_counter()
+
+            # Time to the response headers, the body being the same work
+            # whether warmed up or not.
+            latencies = []
+            for _ in range(2):
+                request_started = perf_counter()
+                with client.stream('GET', '/api/articles/') as response:
+                    latencies.append(perf_counter() - request_started)
+                    response.raise_for_status()
+                    response.read()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        'ready': ready - started,
+        'first_byte': ready - started + latencies[0],
+        'first_request': latencies[0],
+        'second_request': latencies[1],
+    }
+
+
+def measure(env: dict, runs: int) -> dict:
+    imports = [import_seconds(env) for _ in range(runs)]
+    boots = [boot(env) for _ in range(runs)]
+    return {
+        'import_ms': round(median(imports) * 1000, 1),
+        **{
+            f'{name}_ms': round(median(run[name] for run in boots) * 1000, 1)
+            for name in boots[0]
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--db', help='SQLite file to serve')
+    target.add_argument(
+        '--size',
+        choices=('small', 'medium', 'large'),
+        help='seed.py size to serve',
+    )
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('-o', '--output', help='write the JSON here')
+    args = parser.parse_args(argv)
+
+    database = args.db or seeded(args.size)
+    env = {
+        **os.environ,
+        'DB_URL': f'sqlite:///{os.path.abspath(database)}',
+    }
+
+    results = {}
+    for warm_up in ('true', 'false'):
+        print(f'WARM_UP={warm_up}', file=sys.stderr)
+        results[f'warm_up={warm_up}'] = measure(
+            {**env, 'WARM_UP': warm_up}, args.runs
+        )
+        print(f'  {results[f"warm_up={warm_up}"]}', file=sys.stderr)
+
+    report = json.dumps(
+        {
+            'commit': commit(),
+            'python': platform.python_version(),
+            'database': os.path.basename(database),
+            'runs': args.runs,
+            'results': results,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,13 +7,13 @@ from api.db.models import Base
 
 from alembic import context
 
-from api.settings import Settings
+from api.settings import get_settings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
-config.set_main_option("sqlalchemy.url", Settings().DB_URL)
+config.set_main_option("sqlalchemy.url", get_settings().DB_URL)
 
 # Interpret the config file
 target_metadata = Base.metadata
@@ -23,6 +23,12 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # The full-text index and its shadow tables are managed by hand in
+    # api/db/search.py, not through the models.
+    return not (type_ == "table" and name.startswith("articles_fts"))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -39,6 +45,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -62,7 +69,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,113 @@
+"""articles id primary key
+
+Revision ID: 2f9b56d32789
+Revises: 2fc228725bcd
+Create Date: 2026-10-18 12:20:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f9b56d32789'
+down_revision: Union[str, None] = '2fc228725bcd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = (
+    'id, slug, title, description, body, created_at, updated_at, '
+    'user_id, favorites_count, comments_count'
+)
+
+INDEXES = [
+    'CREATE INDEX ix_articles_created_at_id ON articles (created_at, id)',
+    'CREATE INDEX ix_articles_user_id_created_at '
+    'ON articles (user_id, created_at, id)',
+    'CREATE INDEX ix_articles_updated_at_id ON articles (updated_at, id)',
+]
+
+# Dropping `articles` drops the triggers keeping articles_fts in sync.
+FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts (
+            articles_fts, rowid, title, description, body
+        ) VALUES ('delete', old.id, old.title, old.description, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER articles_fts_update
+    AFTER UPDATE OF id, title, description, body ON articles BEGIN
+        INSERT INTO articles_fts (
+            articles_fts, rowid, title, description, body
+        ) VALUES ('delete', old.id, old.title, old.description, old.body);
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """,
+]
+
+
+def rebuild(create: str, indexes: list[str]) -> None:
+    # SQLite cannot move a primary key, so the table is copied into a new
+    # one; ids are kept, and so are the rows referring to them.
+    op.execute(create)
+    op.execute(
+        f'INSERT INTO articles_new ({COLUMNS}) SELECT {COLUMNS} FROM articles'
+    )
+    op.execute('DROP TABLE articles')
+    op.execute('ALTER TABLE articles_new RENAME TO articles')
+    for statement in indexes + INDEXES + FTS_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    # AUTOINCREMENT: the id of a deleted article is never handed out again,
+    # where MAX(id) + 1 gave a new article the id of the newest one deleted.
+    rebuild(
+        """
+        CREATE TABLE articles_new (
+            id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            slug VARCHAR NOT NULL,
+            title VARCHAR NOT NULL,
+            description VARCHAR NOT NULL,
+            body VARCHAR NOT NULL,
+            created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+            updated_at DATETIME NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            favorites_count INTEGER DEFAULT '0' NOT NULL,
+            comments_count INTEGER DEFAULT '0' NOT NULL
+        )
+        """,
+        ['CREATE UNIQUE INDEX ix_articles_slug ON articles (slug)'],
+    )
+
+
+def downgrade() -> None:
+    rebuild(
+        """
+        CREATE TABLE articles_new (
+            id INTEGER NOT NULL,
+            slug VARCHAR NOT NULL PRIMARY KEY,
+            title VARCHAR NOT NULL,
+            description VARCHAR NOT NULL,
+            body VARCHAR NOT NULL,
+            created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+            updated_at DATETIME NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            favorites_count INTEGER DEFAULT '0' NOT NULL,
+            comments_count INTEGER DEFAULT '0' NOT NULL
+        )
+        """,
+        ['CREATE UNIQUE INDEX ix_articles_id ON articles (id)'],
+    )
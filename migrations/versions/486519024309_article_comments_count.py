@@ -0,0 +1,34 @@
+"""article comments count
+
+Revision ID: 486519024309
+Revises: b425022a2068
+Create Date: 2026-10-18 11:18:50.068097
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '486519024309'
+down_revision: Union[str, None] = 'b425022a2068'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('articles', sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        'UPDATE articles SET comments_count = ('
+        'SELECT COUNT(*) FROM comment_association '
+        'WHERE comment_association.article_slug = articles.slug)'
+    )
+
+
+def downgrade() -> None:
+    # A batch migration would recreate articles and lose the full-text
+    # search triggers; SQLite 3.35+ drops the column in place.
+    op.execute('ALTER TABLE articles DROP COLUMN comments_count')
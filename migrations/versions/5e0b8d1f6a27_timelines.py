@@ -0,0 +1,62 @@
+"""timelines
+
+Revision ID: 5e0b8d1f6a27
+Revises: c41f7e2b9d03
+Create Date: 2026-10-18 11:48:05.927713
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0b8d1f6a27'
+down_revision: Union[str, None] = 'c41f7e2b9d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('timelines',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'article_id')
+    )
+    op.create_index('ix_timelines_user_id_created_at', 'timelines', ['user_id', 'created_at', 'article_id'], unique=False)
+    op.create_index('ix_association_table_following_id', 'association_table', ['following_id'], unique=False)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                'followers_count',
+                sa.Integer(),
+                server_default='0',
+                nullable=False,
+            )
+        )
+
+    op.execute(
+        'UPDATE users SET followers_count = ('
+        'SELECT COUNT(*) FROM association_table '
+        'WHERE association_table.following_id = users.id)'
+    )
+    op.execute(
+        'INSERT INTO timelines (user_id, article_id, created_at) '
+        'SELECT association_table.user_id, articles.id, articles.created_at '
+        'FROM association_table JOIN articles '
+        'ON articles.user_id = association_table.following_id'
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('followers_count')
+
+    op.drop_index('ix_association_table_following_id', table_name='association_table')
+    op.drop_index('ix_timelines_user_id_created_at', table_name='timelines')
+    op.drop_table('timelines')
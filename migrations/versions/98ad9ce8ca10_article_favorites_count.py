@@ -0,0 +1,48 @@
+"""article favorites_count
+
+Revision ID: 98ad9ce8ca10
+Revises: 8a55e3765c57
+Create Date: 2026-10-18 10:58:12.412093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '98ad9ce8ca10'
+down_revision: Union[str, None] = '8a55e3765c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every article was stored with id=1, give each one its own id
+    # before counters are keyed on it.
+    op.execute('UPDATE articles SET id = rowid')
+    op.create_index(op.f('ix_articles_id'), 'articles', ['id'], unique=True)
+
+    with op.batch_alter_table('articles') as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                'favorites_count',
+                sa.Integer(),
+                server_default='0',
+                nullable=False,
+            )
+        )
+
+    op.execute(
+        'UPDATE articles SET favorites_count = ('
+        'SELECT COUNT(*) FROM favorite_association '
+        'WHERE favorite_association.article_id = articles.id)'
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('articles') as batch_op:
+        batch_op.drop_column('favorites_count')
+
+    op.drop_index(op.f('ix_articles_id'), table_name='articles')
@@ -0,0 +1,60 @@
+"""article search
+
+Revision ID: b425022a2068
+Revises: 3e56b3fcc7e3
+Create Date: 2026-10-18 11:14:17.023896
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b425022a2068'
+down_revision: Union[str, None] = '3e56b3fcc7e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+    CREATE VIRTUAL TABLE articles_fts USING fts5(
+        title, description, body,
+        content='articles', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """)
+    op.execute("""
+    CREATE TRIGGER articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts (
+            articles_fts, rowid, title, description, body
+        ) VALUES ('delete', old.id, old.title, old.description, old.body);
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER articles_fts_update
+    AFTER UPDATE OF id, title, description, body ON articles BEGIN
+        INSERT INTO articles_fts (
+            articles_fts, rowid, title, description, body
+        ) VALUES ('delete', old.id, old.title, old.description, old.body);
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """)
+
+    op.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER articles_fts_update')
+    op.execute('DROP TRIGGER articles_fts_delete')
+    op.execute('DROP TRIGGER articles_fts_insert')
+    op.execute('DROP TABLE articles_fts')
@@ -0,0 +1,38 @@
+"""tag stats
+
+Revision ID: e7a2c94b1f58
+Revises: 5e0b8d1f6a27
+Create Date: 2026-10-18 13:02:37.551846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c94b1f58'
+down_revision: Union[str, None] = '5e0b8d1f6a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tag_stats',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('articles_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['name'], ['tags.name'], ),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index('ix_tag_stats_articles_count', 'tag_stats', ['articles_count', 'name'], unique=False)
+
+    op.execute(
+        'INSERT INTO tag_stats (name, articles_count) '
+        'SELECT tag_name, COUNT(*) FROM tags_article GROUP BY tag_name'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tag_stats_articles_count', table_name='tag_stats')
+    op.drop_table('tag_stats')
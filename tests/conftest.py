@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+# Read when the app is imported, so set before any `api` import.
+os.environ['DB_URL'] = 'sqlite:///' + os.path.join(
+    tempfile.mkdtemp(), 'test.db'
+)
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('WARM_UP', 'false')
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.app import app  # noqa: E402
+from api.db.database import engine  # noqa: E402
+from api.db.models import Base  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def client():
+    Base.metadata.create_all(engine)
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from api.db.database import engine
+from api.db.models import Article
+
+
+def article_id(slug: str) -> int:
+    with engine.connect() as connection:
+        return connection.scalar(
+            select(Article.id).where(Article.slug == slug)
+        )
+
+
+@pytest.fixture(scope='module')
+def headers(client):
+    client.post(
+        '/api/users',
+        json={
+            'username': 'writer',
+            'email': 'writer@example.com',
+            'password': 'secret',
+            'bio': '',
+            'image': '',
+        },
+    )
+    token = client.post(
+        '/api/users/login',
+        data={'username': 'writer@example.com', 'password': 'secret'},
+    ).json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+def post_article(client, headers, title: str):
+    response = client.post(
+        '/api/articles/',
+        json={
+            'title': title,
+            'description': '',
+            'body': '',
+            'tag_list': [],
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201
+
+
+def test_the_id_of_a_deleted_article_is_not_reused(client, headers):
+    post_article(client, headers, 'Short lived')
+    deleted_id = article_id('short-lived')
+    client.delete('/api/articles/short-lived', headers=headers)
+
+    post_article(client, headers, 'Long lived')
+
+    assert article_id('long-lived') > deleted_id
+
+
+def test_articles_created_together_list_newest_first(client, headers):
+    # One batch shares its created_at, so only the ids order it.
+    body = '\n'.join(
+        json.dumps({'title': title, 'description': '', 'body': ''})
+        for title in ('Batch one', 'Batch two', 'Batch three')
+    )
+    client.post('/api/articles/bulk', content=body, headers=headers)
+
+    response = client.get('/api/articles/?author=writer&limit=3')
+
+    assert [article['slug'] for article in response.json()['articles']] == [
+        'batch-three',
+        'batch-two',
+        'batch-one',
+    ]
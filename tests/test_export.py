@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta, timezone
+
+from api.db.export import export_query
+
+
+def test_updated_since_with_an_offset_is_compared_in_utc():
+    updated_since = datetime(
+        2026, 10, 18, 12, tzinfo=timezone(timedelta(hours=2))
+    )
+
+    params = export_query(updated_since).compile().params
+
+    assert list(params.values()) == [datetime(2026, 10, 18, 10)]
+
+
+def test_naive_updated_since_is_taken_as_utc():
+    params = export_query(datetime(2026, 10, 18, 12)).compile().params
+
+    assert list(params.values()) == [datetime(2026, 10, 18, 12)]
@@ -0,0 +1,92 @@
+import json
+from base64 import urlsafe_b64encode
+
+import pytest
+from fastapi import HTTPException
+
+from api.db.pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(text: str) -> str:
+    return urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def test_decode_cursor_round_trips_encode_cursor():
+    cursor = encode_cursor('2023-10-01 12:00:00.000000', 42)
+
+    assert decode_cursor(cursor) == ['2023-10-01 12:00:00.000000', 42]
+
+
+def test_decode_cursor_accepts_a_search_rank():
+    assert decode_cursor(encode_cursor(-1.5, 7)) == [-1.5, 7]
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'not base64!',
+        raw_cursor('not json'),
+        raw_cursor('{"a":1}'),
+        raw_cursor('[1]'),
+        raw_cursor('[1,2,3]'),
+        raw_cursor('[{"a":1},2]'),
+        raw_cursor('[[1],2]'),
+        raw_cursor('["2023",true]'),
+        raw_cursor(json.dumps(['2023', 2**64])),
+    ],
+)
+def test_decode_cursor_rejects_invalid_cursors(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == 'Invalid cursor'
+
+
+@pytest.fixture(scope='module')
+def headers(client):
+    client.post(
+        '/api/users',
+        json={
+            'username': 'reader',
+            'email': 'reader@example.com',
+            'password': 'secret',
+            'bio': '',
+            'image': '',
+        },
+    )
+    token = client.post(
+        '/api/users/login',
+        data={'username': 'reader@example.com', 'password': 'secret'},
+    ).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/api/articles/',
+        json={
+            'title': 'Some article',
+            'description': 'About dragons',
+            'body': 'Dragons, mostly.',
+            'tag_list': [],
+        },
+        headers=headers,
+    )
+    return headers
+
+
+@pytest.mark.parametrize(
+    'url',
+    [
+        '/api/articles/',
+        '/api/articles/feed',
+        '/api/articles/some-article/comments',
+        '/api/articles/search?q=dragon',
+    ],
+)
+def test_non_scalar_cursor_is_a_bad_request(client, headers, url):
+    separator = '&' if '?' in url else '?'
+    cursor = raw_cursor('[{"a":1},2]')
+
+    response = client.get(f'{url}{separator}cursor={cursor}', headers=headers)
+
+    assert response.status_code == 400
+    assert response.json() == {'detail': 'Invalid cursor'}
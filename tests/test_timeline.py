@@ -0,0 +1,77 @@
+from api.settings import get_settings
+
+
+def sign_up(client, username: str) -> dict:
+    client.post(
+        '/api/users',
+        json={
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'secret',
+            'bio': '',
+            'image': '',
+        },
+    )
+    token = client.post(
+        '/api/users/login',
+        data={'username': f'{username}@example.com', 'password': 'secret'},
+    ).json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+def feed(client, headers) -> list[str]:
+    response = client.get('/api/articles/feed', headers=headers)
+    return [article['slug'] for article in response.json()['articles']]
+
+
+def test_articles_written_over_the_limit_stay_after_an_unfollow(
+    client, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), 'FEED_FANOUT_MAX_FOLLOWERS', 1)
+    author = sign_up(client, 'popular')
+    follower = sign_up(client, 'loyal')
+    passer_by = sign_up(client, 'fickle')
+    client.post('/api/profiles/popular/follow', headers=follower)
+    client.post('/api/profiles/popular/follow', headers=passer_by)
+
+    # Over the limit: pulled at read time, not fanned out.
+    client.post(
+        '/api/articles/',
+        json={
+            'title': 'Written while popular',
+            'description': '',
+            'body': '',
+            'tag_list': [],
+        },
+        headers=author,
+    )
+    assert feed(client, follower) == ['written-while-popular']
+
+    client.delete('/api/profiles/popular/follow', headers=passer_by)
+
+    assert feed(client, follower) == ['written-while-popular']
+
+
+def test_articles_written_over_the_limit_stay_after_a_follower_leaves(
+    client, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), 'FEED_FANOUT_MAX_FOLLOWERS', 1)
+    author = sign_up(client, 'famous')
+    follower = sign_up(client, 'devoted')
+    leaver = sign_up(client, 'leaver')
+    client.post('/api/profiles/famous/follow', headers=follower)
+    client.post('/api/profiles/famous/follow', headers=leaver)
+    client.post(
+        '/api/articles/',
+        json={
+            'title': 'Written while famous',
+            'description': '',
+            'body': '',
+            'tag_list': [],
+        },
+        headers=author,
+    )
+
+    client.delete('/api/user', headers=leaver)
+
+    assert feed(client, follower) == ['written-while-famous']